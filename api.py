@@ -0,0 +1,115 @@
+"""
+Servicio HTTP del agente de RentaCar.
+
+Cada petición usa su propia sesión de base de datos; el estado pesado (ventana
+del optimizador, matchers compilados, cliente LLM, caché de respuestas) se crea
+una vez por proceso y se comparte entre peticiones.
+
+El esquema se crea o migra una sola vez antes de arrancar los workers, nunca
+desde cada uno de ellos: varios procesos ejecutando DDL a la vez sobre el mismo
+fichero SQLite fallan por bloqueo.
+
+Uso:
+    python api.py  # migra el esquema y arranca con API_HOST, API_PORT y API_WORKERS
+    python -m src.database.crud && uvicorn api:app --workers 4
+"""
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from src.agents.rentacar_agent import RentaCarAgent
+from src.config import Config
+from src.database.crud import get_engine, get_session_factory, init_db
+from src.learning.response_optimizer import ResponseOptimizer
+from src.utils.metrics import LogExporter, PeriodicExport, PrometheusExporter, metrics
+from src.utils.stub_llm import StubLLM
+
+SessionLocal = get_session_factory()
+
+
+class QueryRequest(BaseModel):
+    query: str = Field(min_length=1)
+    additional_context: Optional[Dict[str, Any]] = None
+
+
+class FeedbackRequest(BaseModel):
+    interaction_id: int
+    feedback_score: float = Field(ge=0, le=5)
+    comments: Optional[str] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Estado compartido de este proceso worker
+    session = SessionLocal()
+    llm = StubLLM(latency=Config.STUB_LLM_LATENCY) if Config.LLM_BACKEND == "stub" else None
+    optimizer = ResponseOptimizer(session)
+    optimizer.refresh(force=True)
+    app.state.agent = RentaCarAgent(session, optimizer, llm=llm)
+
+    exporter = None
+    if metrics.enabled and Config.METRICS_LOG_INTERVAL:
+        exporter = PeriodicExport(metrics, LogExporter(), Config.METRICS_LOG_INTERVAL)
+    try:
+        yield
+    finally:
+        if exporter is not None:
+            exporter.stop()
+        if app.state.agent.batcher is not None:
+            app.state.agent.batcher.close()
+        optimizer.flush_metrics()
+        session.close()
+
+
+app = FastAPI(title="RentaCar Agent", lifespan=lifespan)
+
+
+def get_session():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def get_agent(request: Request, session: Session = Depends(get_session)) -> RentaCarAgent:
+    return request.app.state.agent.with_session(session)
+
+
+# Endpoints síncronos: FastAPI los ejecuta en su pool de hilos
+@app.post("/query")
+def query(body: QueryRequest, agent: RentaCarAgent = Depends(get_agent)) -> Dict[str, Any]:
+    return agent.process_query(body.query, body.additional_context)
+
+
+@app.post("/feedback")
+def feedback(body: FeedbackRequest, agent: RentaCarAgent = Depends(get_agent)) -> Dict[str, Any]:
+    try:
+        found = agent.process_feedback(body.interaction_id, body.feedback_score, body.comments, raise_errors=True)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Error al procesar el feedback") from e
+    if not found:
+        raise HTTPException(status_code=404, detail="Interacción no encontrada")
+    return {'processed': True}
+
+
+@app.get("/health")
+def health() -> Dict[str, Any]:
+    return {'status': 'ok'}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint() -> str:
+    # Métricas del proceso worker que atiende la petición
+    return PrometheusExporter().render(metrics.snapshot())
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    init_db(get_engine())
+    uvicorn.run("api:app", host=Config.API_HOST, port=Config.API_PORT, workers=Config.API_WORKERS)
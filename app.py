@@ -1,61 +1,68 @@
 import streamlit as st
 from datetime import datetime
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 from src.agents.rentacar_agent import RentaCarAgent
 from src.learning.response_optimizer import ResponseOptimizer
-from src.database.models import Base
+from src.database.crud import get_engine, get_session_factory, init_db
 
-# Configuración de la base de datos
-DATABASE_URL = "sqlite:///./test.db"  # Cambia esto a tu URL de base de datos
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Crear las tablas en la base de datos
-Base.metadata.create_all(bind=engine)
+@st.cache_resource
+def load_agent() -> RentaCarAgent:
+    """
+    Streamlit re-ejecuta el script en cada interacción: el engine, las tablas,
+    el optimizador y el agente se crean una sola vez por proceso
+    """
+    # Configuración de la base de datos (Config.DATABASE_URL) y creación de tablas e índices
+    init_db(get_engine())
 
-# Inicializar el agente y el optimizador de respuestas
-session = SessionLocal()
-response_optimizer = ResponseOptimizer(session)
-agent = RentaCarAgent(session, response_optimizer)
+    # Inicializar el agente y el optimizador de respuestas
+    session = get_session_factory()()
+    response_optimizer = ResponseOptimizer(session)
+    return RentaCarAgent(session, response_optimizer)
 
-# Configuración de la aplicación Streamlit
-st.title("Agente de Atención al Cliente - RentACar")
 
-# Entrada de texto para la consulta del usuario
-query = st.text_input("Introduce tu consulta:")
+# Una sesión de base de datos por ejecución del script, sobre el agente compartido
+session = get_session_factory()()
+agent = load_agent().with_session(session)
 
-# Botón para enviar la consulta
-if st.button("Enviar"):
-    if query:
-        # Procesar la consulta con el agente
-        result = agent.process_query(query)
+try:
+    # Configuración de la aplicación Streamlit
+    st.title("Agente de Atención al Cliente - RentACar")
 
-        # Mostrar la respuesta del agente
-        st.write("**Respuesta del Agente:**")
-        st.write(result.get('response', 'No se pudo obtener una respuesta.'))
+    # Entrada de texto para la consulta del usuario
+    query = st.text_input("Introduce tu consulta:")
 
-        # Mostrar el contexto utilizado si está disponible
-        if 'context' in result:
-            st.write("**Contexto Utilizado:**")
-            st.json(result['context'])
-        else:
-            st.write("No se pudo obtener el contexto.")
-
-        # Entrada de feedback del usuario
-        feedback_score = st.slider("Puntuación del Feedback (0-5):", 0.0, 5.0, 3.0)
-        feedback_comments = st.text_area("Comentarios del Feedback:")
-
-        # Botón para enviar el feedback
-        if st.button("Enviar Feedback"):
-            interaction_id = result.get('interaction_id')
-            if interaction_id is not None:
-                feedback_processed = agent.process_feedback(interaction_id, feedback_score, feedback_comments)
-                if feedback_processed:
-                    st.success("Feedback procesado correctamente.")
-                else:
-                    st.error("Error al procesar el feedback.")
+    # Botón para enviar la consulta
+    if st.button("Enviar"):
+        if query:
+            # Procesar la consulta con el agente mostrando la respuesta a medida que se genera
+            st.write("**Respuesta del Agente:**")
+            stream = agent.process_query_stream(query)
+            st.write_stream(stream)
+            result = stream.result or {}
+
+            # Mostrar el contexto utilizado si está disponible
+            if 'context' in result:
+                st.write("**Contexto Utilizado:**")
+                st.json(result['context'])
             else:
-                st.error("No se pudo obtener el ID de la interacción.")
-    else:
-        st.error("Por favor, introduce una consulta.")
\ No newline at end of file
+                st.write("No se pudo obtener el contexto.")
+
+            # Entrada de feedback del usuario
+            feedback_score = st.slider("Puntuación del Feedback (0-5):", 0.0, 5.0, 3.0)
+            feedback_comments = st.text_area("Comentarios del Feedback:")
+
+            # Botón para enviar el feedback
+            if st.button("Enviar Feedback"):
+                interaction_id = result.get('interaction_id')
+                if interaction_id is not None:
+                    feedback_processed = agent.process_feedback(interaction_id, feedback_score, feedback_comments)
+                    if feedback_processed:
+                        st.success("Feedback procesado correctamente.")
+                    else:
+                        st.error("Error al procesar el feedback.")
+                else:
+                    st.error("No se pudo obtener el ID de la interacción.")
+        else:
+            st.error("Por favor, introduce una consulta.")
+finally:
+    session.close()
@@ -0,0 +1,51 @@
+"""
+Compara dos ficheros de resultados de benchmarks/run_benchmarks.py y marca
+las regresiones de latencia por encima de un umbral.
+
+Uso:
+    python -m benchmarks.compare base.json nuevo.json --threshold 0.10
+"""
+import argparse
+import json
+import sys
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def compare(baseline: dict, current: dict, threshold: float):
+    """Devuelve filas (benchmark, métrica, base, actual, variación, regresión)"""
+    rows = []
+    for name, base_result in baseline['results'].items():
+        current_result = current['results'].get(name)
+        if current_result is None:
+            continue
+        for metric in METRICS:
+            base, value = base_result[metric], current_result[metric]
+            change = (value - base) / base if base else 0.0
+            rows.append((name, metric, base, value, change, change > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.10, help="Empeoramiento relativo tolerado")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold)
+    for name, metric, base, value, change, regression in rows:
+        flag = "REGRESIÓN" if regression else ""
+        print(f"{name:<20} {metric:<8} {base:>10.3f} -> {value:>10.3f} ({change:+.1%}) {flag}")
+
+    if any(row[-1] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Prueba de carga del servicio HTTP (api.py) con distinto número de workers.
+
+Arranca uvicorn contra una base SQLite temporal con datos sintéticos y un LLM
+simulado, lanza peticiones /query concurrentes (y feedback sobre una parte de
+ellas) y muestra cómo escala el throughput con los workers.
+
+Uso:
+    python -m benchmarks.load_test --workers 1 2 4 --requests 1000 --concurrency 32
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from benchmarks.synthetic import populate, synthetic_query
+from src.database.crud import create_db_engine, create_session_factory, init_db
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("El servidor terminó durante el arranque")
+        try:
+            if requests.get(f"{base_url}/health", timeout=1).ok:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("El servidor no respondió a tiempo")
+
+
+def run_load(base_url: str, n_requests: int, concurrency: int, feedback_ratio: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    queries = [synthetic_query(rng) for _ in range(n_requests)]
+    # El feedback se sortea aquí y no en los hilos, cuyo orden varía entre ejecuciones
+    feedback_scores = [round(rng.uniform(1, 5), 1) if rng.random() < feedback_ratio else None
+                       for _ in range(n_requests)]
+    local = threading.local()
+
+    def call(query: str, feedback_score: float = None):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{base_url}/query", json={'query': query}, timeout=120)
+            result = response.json()
+            ok = response.ok and 'error' not in result
+            if ok and feedback_score is not None:
+                session.post(f"{base_url}/feedback", timeout=120, json={
+                    'interaction_id': result['interaction_id'],
+                    'feedback_score': feedback_score
+                })
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(call, queries, feedback_scores))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array([latency for latency, _ in outcomes]) * 1000
+    return {
+        'requests': n_requests,
+        'errors': sum(1 for _, ok in outcomes if not ok),
+        'throughput_rps': n_requests / elapsed,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--rows', type=int, default=10_000, help="Interacciones sintéticas en la base")
+    parser.add_argument('--llm-latency', type=float, default=0.05, help="Latencia simulada del LLM en segundos")
+    parser.add_argument('--feedback-ratio', type=float, default=0.2)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output', help="Fichero JSON de resultados")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rentacar-load-")
+    database_url = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    engine = create_db_engine(database_url)
+    init_db(engine)
+    session = create_session_factory(engine)()
+    populate(session, args.rows)
+    session.close()
+    engine.dispose()
+
+    env = dict(os.environ, DATABASE_URL=database_url, LLM_BACKEND="stub",
+               STUB_LLM_LATENCY=str(args.llm_latency))
+    base_url = f"http://127.0.0.1:{args.port}"
+    results = {}
+    try:
+        for workers in args.workers:
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'uvicorn', 'api:app', '--host', '127.0.0.1',
+                 '--port', str(args.port), '--workers', str(workers), '--log-level', 'warning'],
+                env=env
+            )
+            try:
+                wait_until_ready(base_url, process)
+                # Calentamiento: cada worker carga su ventana al arrancar
+                run_load(base_url, args.concurrency, args.concurrency, 0.0, seed=workers)
+                results[workers] = run_load(base_url, args.requests, args.concurrency,
+                                            args.feedback_ratio, seed=0)
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'errores':>8}")
+    for workers, result in results.items():
+        print(f"{workers:>8} {result['throughput_rps']:>10.1f} {result['p50_ms']:>10.1f}"
+              f" {result['p95_ms']:>10.1f} {result['p99_ms']:>10.1f} {result['errors']:>8}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
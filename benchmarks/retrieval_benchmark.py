@@ -0,0 +1,121 @@
+"""
+Benchmark de la capa de recuperación de fichas técnicas a escala de catálogo.
+
+Mide el indexado inicial (con cálculo de embeddings), el re-indexado con la
+caché de embeddings caliente y la latencia de consulta top-k.
+
+Uso:
+    python -m benchmarks.retrieval_benchmark --chunks 50000 --queries 500
+    python -m benchmarks.retrieval_benchmark --embedder hashing  # sin descargar el modelo
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import insert
+
+from benchmarks.synthetic import VEHICLES
+from src.database.crud import create_db_engine, create_session_factory, init_db
+from src.database.models import DocumentChunk
+from src.retrieval.embeddings import CachedEmbedder, EmbeddingCache
+from src.retrieval.spec_retriever import SpecRetriever
+
+BRANDS = ['Toyota', 'Seat', 'Renault', 'Kia', 'Hyundai', 'Peugeot', 'Ford', 'BMW', 'Audi', 'Dacia']
+FEATURES = ['maletero', 'consumo', 'plazas', 'motor', 'transmisión', 'autonomía', 'navegador', 'isofix']
+
+
+class HashingEmbedder(CachedEmbedder):
+    """Embeddings por hashing de palabras: mide el almacén vectorial sin cargar el modelo"""
+
+    dimensions = 384
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                bucket = int(hashlib.md5(word.encode()).hexdigest()[:8], 16)
+                vectors[row, bucket % self.dimensions] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+def synthetic_spec(rng: random.Random) -> str:
+    brand, vehicle = rng.choice(BRANDS), rng.choice(VEHICLES)
+    return (f"{brand} modelo {rng.randrange(100, 999)} ({vehicle}). Motor de {rng.randrange(90, 300)} cv, "
+            f"consumo de {rng.uniform(3.5, 9.5):.1f} l/100km, maletero de {rng.randrange(250, 900)} litros, "
+            f"{rng.choice([2, 4, 5, 7, 9])} plazas, transmisión {rng.choice(['manual', 'automática'])}. "
+            f"Equipamiento: {', '.join(rng.sample(FEATURES, 3))}.")
+
+
+def percentiles(latencies) -> dict:
+    latencies_ms = np.array(latencies) * 1000
+    return {f'p{q}_ms': float(np.percentile(latencies_ms, q)) for q in (50, 95, 99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunks', type=int, default=50_000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--top-k', type=int, default=4)
+    parser.add_argument('--embedder', choices=['model', 'hashing'], default='model')
+    parser.add_argument('--output', help="Fichero JSON de resultados")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    workdir = tempfile.mkdtemp(prefix="rentacar-retrieval-")
+    try:
+        engine = create_db_engine(f"sqlite:///{os.path.join(workdir, 'specs.db')}")
+        init_db(engine)
+        session = create_session_factory(engine)()
+        session.execute(insert(DocumentChunk), [
+            {'source': f"ficha_{index // 5}.pdf", 'chunk_index': index % 5, 'text': synthetic_spec(rng)}
+            for index in range(args.chunks)
+        ])
+        session.commit()
+
+        def build_retriever(store: str) -> SpecRetriever:
+            embedder_class = HashingEmbedder if args.embedder == 'hashing' else CachedEmbedder
+            cache = EmbeddingCache(os.path.join(workdir, 'embeddings.sqlite'))
+            return SpecRetriever(embedder_class(cache=cache), os.path.join(workdir, store), top_k=args.top_k)
+
+        results = {}
+        retriever = build_retriever('store-cold')
+        start = time.perf_counter()
+        retriever.sync(session)
+        results['index_cold_s'] = time.perf_counter() - start
+        results['embeddings_computed'] = retriever.embedder.computed
+
+        # Colección nueva con la caché caliente: no debe recalcularse ningún embedding
+        warm = build_retriever('store-warm')
+        start = time.perf_counter()
+        warm.sync(session)
+        results['index_warm_cache_s'] = time.perf_counter() - start
+        results['embeddings_recomputed'] = warm.embedder.computed
+
+        queries = [f"{rng.choice(FEATURES)} del {rng.choice(VEHICLES)} {rng.choice(BRANDS)}"
+                   for _ in range(args.queries)]
+        for label in ('query_cold', 'query_warm'):
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                retriever.retrieve(query)
+                latencies.append(time.perf_counter() - start)
+            results[label] = percentiles(latencies)
+        session.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Suite de benchmarks de los caminos calientes del agente sobre datos sintéticos.
+
+Mide latencia p50/p95/p99, throughput y memoria pico de cada operación y
+guarda los resultados en JSON para compararlos entre ejecuciones con
+benchmarks/compare.py.
+
+Uso:
+    python -m benchmarks.run_benchmarks --rows 100000 --output bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.synthetic import populate, synthetic_context, synthetic_query, synthetic_response
+from src.agents.rentacar_agent import RentaCarAgent
+from src.agents.response_cache import ResponseCache
+from src.context.context_builder import ContextBuilder
+from src.database.crud import create_db_engine, create_session_factory, init_db
+from src.learning.response_optimizer import ResponseOptimizer
+from src.utils.stub_llm import StubLLM
+
+
+def measure(func, iterations: int, memory_iterations: int) -> dict:
+    """Ejecuta `func(i)` y resume latencias, throughput y memoria pico"""
+    # Una llamada previa sin medir: las importaciones diferidas tienen su propio benchmark de arranque
+    func(0)
+    latencies = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        start = time.perf_counter()
+        func(i)
+        latencies.append(time.perf_counter() - start)
+    elapsed = time.perf_counter() - started
+
+    # La memoria se mide en una pasada aparte para no distorsionar las latencias
+    tracemalloc.start()
+    for i in range(memory_iterations):
+        func(iterations + i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'iterations': iterations,
+        'mean_ms': float(latencies_ms.mean()),
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'throughput_ops': iterations / elapsed if elapsed else 0.0,
+        'peak_memory_kb': peak / 1024,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(rows: int, iterations: int, llm_latency: float, database_url: str = None, seed: int = 0) -> dict:
+    workdir = None
+    if database_url is None:
+        workdir = tempfile.mkdtemp(prefix="rentacar-bench-")
+        database_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    engine = create_db_engine(database_url)
+    init_db(engine)
+    session = create_session_factory(engine)()
+
+    populate_start = time.perf_counter()
+    populate(session, rows, seed=seed)
+    populate_seconds = time.perf_counter() - populate_start
+
+    rng = random.Random(seed + 1)
+    queries = [synthetic_query(rng) for _ in range(iterations * 2)]
+    contexts = [synthetic_context(rng) for _ in range(iterations * 2)]
+    memory_iterations = max(1, min(iterations // 10, 50))
+
+    builder = ContextBuilder()
+    optimizer = ResponseOptimizer(session, refresh_interval=float('inf'))
+    # Sin caché de respuestas para medir el pipeline completo
+    agent = RentaCarAgent(session, optimizer, response_cache=ResponseCache(max_size=0),
+                          llm=StubLLM(latency=llm_latency))
+
+    results = {}
+    # Recarga completa de la ventana (refresh sólo recarga entera cada full_reload_interval)
+    results['optimizer_load'] = measure(lambda i: optimizer.store.load(session), 3, 1)
+    results['build_context'] = measure(lambda i: builder.build_context(queries[i]), iterations, memory_iterations)
+    results['analyze_query'] = measure(
+        lambda i: optimizer.analyze_query(queries[i], contexts[i]), iterations, memory_iterations
+    )
+
+    results['record_interaction'] = measure(
+        lambda i: agent._record_interaction(
+            queries[i], synthetic_response(rng), 'pricing', builder.build_context(queries[i])
+        ),
+        iterations, memory_iterations
+    )
+    results['process_feedback'] = measure(
+        lambda i: agent.process_feedback(rng.randrange(1, rows + 1), round(rng.uniform(1, 5), 1)),
+        iterations, memory_iterations
+    )
+    results['process_query'] = measure(lambda i: agent.process_query(queries[i]), iterations, memory_iterations)
+
+    session.close()
+    engine.dispose()
+    if workdir is not None:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'rows': rows,
+            'iterations': iterations,
+            'llm_latency': llm_latency,
+            'populate_seconds': populate_seconds,
+        },
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10_000, help="Interacciones sintéticas (1k a 1M)")
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--llm-latency', type=float, default=0.0, help="Latencia simulada del LLM en segundos")
+    parser.add_argument('--database', help="URL de base de datos; por defecto un SQLite temporal")
+    parser.add_argument('--output', default='benchmark_results.json')
+    args = parser.parse_args()
+
+    report = run(args.rows, args.iterations, args.llm_latency, args.database)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'benchmark':<20} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'ops/s':>10} {'peak KB':>10}")
+    for name, result in report['results'].items():
+        print(f"{name:<20} {result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} {result['p99_ms']:>10.3f}"
+              f" {result['throughput_ops']:>10.1f} {result['peak_memory_kb']:>10.1f}")
+    print(f"Resultados guardados en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark de arranque en frío: tiempo de importación de los módulos del agente
+y tiempo hasta la primera respuesta, cada repetición en un intérprete nuevo.
+
+Uso:
+    python -m benchmarks.startup_benchmark --repeat 5 --rows 10000
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.synthetic import populate
+from src.database.crud import create_db_engine, create_session_factory, init_db
+
+# Se ejecuta en un proceso hijo; imprime los tiempos como JSON
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from src.agents.rentacar_agent import RentaCarAgent
+from src.database.crud import get_engine, get_session_factory, init_db
+from src.learning.response_optimizer import ResponseOptimizer
+imported = time.perf_counter()
+
+from src.utils.stub_llm import StubLLM
+init_db(get_engine())
+session = get_session_factory()()
+agent = RentaCarAgent(session, ResponseOptimizer(session), llm=StubLLM(latency=0))
+ready = time.perf_counter()
+result = agent.process_query(sys.argv[1])
+answered = time.perf_counter()
+print(json.dumps({
+    'import_s': imported - start,
+    'init_s': ready - imported,
+    'first_response_s': answered - ready,
+    'total_s': answered - start,
+    'error': result.get('error')
+}))
+"""
+
+
+def run_child(database_url: str, query: str) -> dict:
+    env = dict(os.environ, DATABASE_URL=database_url)
+    output = subprocess.check_output([sys.executable, '-c', CHILD, query], env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--rows', type=int, default=10_000, help="Interacciones sintéticas en la base")
+    parser.add_argument('--query', default="¿Cuánto cuesta alquilar un SUV para el fin de semana?")
+    parser.add_argument('--output', help="Fichero JSON de resultados")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rentacar-startup-")
+    database_url = f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+    try:
+        engine = create_db_engine(database_url)
+        init_db(engine)
+        session = create_session_factory(engine)()
+        populate(session, args.rows)
+        session.close()
+        engine.dispose()
+
+        runs = [run_child(database_url, args.query) for _ in range(args.repeat)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    errors = [run['error'] for run in runs if run['error']]
+    if errors:
+        print(f"Aviso: {len(errors)} ejecuciones terminaron con error: {errors[0]}")
+
+    summary = {
+        key: {'median': statistics.median(run[key] for run in runs), 'min': min(run[key] for run in runs)}
+        for key in ('import_s', 'init_s', 'first_response_s', 'total_s')
+    }
+    print(f"{'fase':<18} {'mediana s':>10} {'mínimo s':>10}")
+    for key, values in summary.items():
+        print(f"{key:<18} {values['median']:>10.3f} {values['min']:>10.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'args': vars(args), 'runs': runs, 'summary': summary}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
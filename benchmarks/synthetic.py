@@ -0,0 +1,105 @@
+"""
+Generador de datos sintéticos realistas para benchmarks: categorías,
+plantillas e interacciones con contextos como los que produce el agente.
+"""
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from src.database.models import QueryCategory, ResponseTemplate, Interaction
+
+TOPICS = {
+    'pricing': ['precio', 'tarifa', 'costo', 'cuánto cuesta', 'descuento', 'oferta', 'pagar'],
+    'booking': ['reservar', 'reserva', 'alquilar', 'disponible', 'cancelar', 'modificar', 'fecha'],
+    'vehicle_info': ['vehículo', 'coche', 'maletero', 'consumo', 'automático', 'plazas', 'motor'],
+    'damage': ['daño', 'accidente', 'rayón', 'golpe', 'reparación', 'franquicia', 'parte'],
+    'claims': ['reclamo', 'queja', 'problema', 'reembolso', 'cobro', 'factura', 'atención'],
+}
+VEHICLES = ['suv', 'sedan', 'compacto', 'van', 'lujo', 'furgoneta', 'camioneta', 'familiar']
+PLACES = ['aeropuerto', 'centro', 'estación', 'hotel', 'puerto', 'oficina']
+FILLERS = ['para', 'el', 'fin', 'de', 'semana', 'mañana', 'una', 'semana', 'con', 'sin', 'mi', 'por', 'favor']
+SEASONS = ['LOW', 'MEDIUM', 'HIGH']
+PRICE_RANGES = [None, [20, 50], [40, 90], [80, 200]]
+RESPONSE_WORDS = ['gracias', 'reserva', 'vehículo', 'tarifa', 'seguro', 'excelente', 'problema',
+                  'disponible', 'kilometraje', 'depósito', 'ayuda', 'oficina', 'horario', 'perfecto']
+
+TEMPLATES = [
+    "Para un {vehicle_type} en {season} las tarifas parten de nuestro precio base.",
+    "Gracias por tu consulta sobre {query_intent}. Te ayudamos con tu reserva.",
+    "Nuestro {vehicle_type} incluye seguro básico y kilometraje ilimitado.",
+    "Lamentamos el problema. Un agente revisará tu caso de {query_intent}.",
+    "Puedes reportar daños desde la app indicando el {vehicle_type} afectado.",
+]
+
+
+def synthetic_query(rng: random.Random) -> str:
+    topic = rng.choice(list(TOPICS))
+    words = rng.sample(TOPICS[topic], 2) + [rng.choice(VEHICLES), rng.choice(PLACES)]
+    words += rng.sample(FILLERS, 3)
+    rng.shuffle(words)
+    return ' '.join(words)
+
+
+def synthetic_context(rng: random.Random) -> dict:
+    return {
+        'vehicle_type': rng.choice(VEHICLES).upper(),
+        'season': rng.choice(SEASONS),
+        'price_range': rng.choice(PRICE_RANGES)
+    }
+
+
+def synthetic_response(rng: random.Random) -> str:
+    return ' '.join(rng.choice(RESPONSE_WORDS) for _ in range(rng.randint(10, 80)))
+
+
+def synthetic_interaction(rng: random.Random, row_id: int, now: datetime,
+                          n_categories: int, n_templates: int, days: int = 60) -> dict:
+    """Fila de interacción tal como la registraría el agente"""
+    timestamp = now - timedelta(seconds=rng.randrange(days * 86400))
+    has_feedback = rng.random() < 0.7
+    return {
+        'id': row_id,
+        'timestamp': timestamp,
+        'query': synthetic_query(rng),
+        'response': synthetic_response(rng),
+        'category_id': rng.randrange(1, n_categories + 1),
+        'template_id': rng.randrange(1, n_templates + 1) if rng.random() < 0.6 else None,
+        'context': {**synthetic_context(rng), 'query_intent': rng.choice(['cotización', 'reserva', 'información']),
+                    'timestamp': timestamp.isoformat()},
+        'feedback_score': round(rng.uniform(1, 5), 1) if has_feedback else None,
+        'feedback_timestamp': timestamp + timedelta(minutes=rng.randrange(1, 120)) if has_feedback else None,
+    }
+
+
+def populate(session, n_interactions: int, n_templates_per_category: int = 5,
+             seed: int = 0, chunk_size: int = 20_000):
+    """Inserta categorías, plantillas e interacciones sintéticas en la base de datos"""
+    rng = random.Random(seed)
+    categories = list(TOPICS) + ['general']
+    session.execute(insert(QueryCategory), [
+        {'id': index, 'name': name, 'description': f"Consultas de {name}", 'success_patterns': {}}
+        for index, name in enumerate(categories, start=1)
+    ])
+
+    templates = []
+    for category_id in range(1, len(categories) + 1):
+        for _ in range(n_templates_per_category):
+            templates.append({
+                'id': len(templates) + 1,
+                'category_id': category_id,
+                'template': rng.choice(TEMPLATES),
+                'use_count': 0,
+                'feedback_sum': 0.0,
+                'success_count': 0,
+            })
+    session.execute(insert(ResponseTemplate), templates)
+
+    now = datetime.utcnow()
+    for start in range(0, n_interactions, chunk_size):
+        rows = [
+            synthetic_interaction(rng, row_id, now, len(categories), len(templates))
+            for row_id in range(start + 1, min(start + chunk_size, n_interactions) + 1)
+        ]
+        session.execute(insert(Interaction), rows)
+    session.commit()
@@ -1,23 +1,22 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.ext.declarative import declarative_base
-
 from src.agents.rentacar_agent import RentaCarAgent
-from src.database.models import Base
+from src.database.crud import get_engine, get_session_factory, init_db
 from src.learning.response_optimizer import ResponseOptimizer
+from src.utils.metrics import start_exporters
 
-# Configuración de la base de datos
-DATABASE_URL = "sqlite:///rentacar.db"  # Puedes cambiar esto según tu configuración
-engine = create_engine(DATABASE_URL)
+# Configuración de la base de datos (Config.DATABASE_URL)
+engine = get_engine()
 
-# Crear todas las tablas
-Base.metadata.create_all(engine)
+# Crear todas las tablas y los índices
+init_db(engine)
 
 # Crear fábrica de sesiones
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = get_session_factory()
 
 
 async def main():
+    # Exportadores de métricas configurados (endpoint Prometheus / log periódico)
+    start_exporters()
+
     # Crear una nueva sesión
     session = SessionLocal()
 
@@ -27,7 +26,7 @@ async def main():
         agent = RentaCarAgent(session, optimizer)
 
         # Procesar una consulta
-        result = agent.process_query(
+        result = await agent.process_query_async(
             "¿Cuánto cuesta alquilar un SUV para el fin de semana?",
             additional_context={
                 'season': 'high_season',
@@ -40,7 +39,7 @@ async def main():
 
         # Simular feedback del cliente
         if 'interaction_id' in result:
-            feedback_result = agent.process_feedback(
+            feedback_result = await agent.process_feedback_async(
                 interaction_id=result['interaction_id'],
                 feedback_score=4.5,
                 comments="Respuesta clara y precisa"
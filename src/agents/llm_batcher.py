@@ -0,0 +1,132 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from src.utils.metrics import MetricsRegistry, metrics as default_metrics
+
+# Marca de parada para el hilo coordinador
+_STOP = object()
+
+
+class LLMBatcher:
+    """
+    Agrupa los prompts pendientes durante una ventana corta y los envía al LLM
+    en una sola llamada batch concurrente; cada llamante recibe su propio resultado.
+    El llenado de los lotes se publica en los contadores llm_batch_*: prompts
+    entre slots es la proporción de llenado y prompts entre lotes el tamaño medio
+    """
+
+    def __init__(self, llm, max_batch_size: int = 16, max_wait: float = 0.02,
+                 request_timeout: float = 60.0, max_concurrent_batches: int = 4,
+                 metrics: MetricsRegistry = None):
+        self.llm = llm
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait  # Segundos que se espera a completar un lote
+        self.request_timeout = request_timeout
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_batches,
+                                            thread_name_prefix="llm-batch")
+        self.metrics = metrics if metrics is not None else default_metrics
+        self._closed = False
+        self._worker = threading.Thread(target=self._collect, name="llm-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, messages) -> Future:
+        """Encola un prompt y devuelve un Future con el texto generado"""
+        if self._closed:
+            raise RuntimeError("El LLMBatcher está cerrado")
+        future = Future()
+        self._queue.put((messages, future))
+        return future
+
+    def generate(self, messages, timeout: float = None) -> str:
+        """Genera la respuesta de un prompt esperando a que se procese su lote"""
+        future = self.submit(messages)
+        try:
+            return future.result(timeout=timeout or self.request_timeout)
+        except FutureTimeoutError:
+            self._on_timeout(future)
+            raise TimeoutError("Tiempo de espera agotado generando la respuesta")
+
+    async def agenerate(self, messages, timeout: float = None) -> str:
+        """Versión asíncrona de generate"""
+        future = self.submit(messages)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.request_timeout)
+        except asyncio.TimeoutError:
+            self._on_timeout(future)
+            raise TimeoutError("Tiempo de espera agotado generando la respuesta")
+
+    def close(self):
+        """Procesa los prompts ya encolados y detiene los hilos"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._worker.join()
+        self._executor.shutdown(wait=True)
+
+    def _on_timeout(self, future: Future):
+        # Si el lote aún no ha salido, la petición se descarta
+        future.cancel()
+        self.metrics.increment('llm_batch_timeouts')
+
+    def _collect(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        # Las peticiones canceladas por timeout no se envían al LLM
+        batch = [(messages, future) for messages, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        self.metrics.increment('llm_batches')
+        self.metrics.increment('llm_batch_prompts', len(batch))
+        self.metrics.increment('llm_batch_slots', self.max_batch_size)
+
+        try:
+            # generate() de los modelos de chat de LangChain procesa los prompts uno tras otro:
+            # batch() los lanza en paralelo y devuelve la excepción de cada prompt por separado
+            with self.metrics.span('llm_batch'):
+                results = self.llm.batch(
+                    [messages for messages, _ in batch],
+                    config={'max_concurrency': len(batch)},
+                    return_exceptions=True
+                )
+
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    self.metrics.increment('llm_batch_errors')
+                    future.set_exception(result)
+                else:
+                    future.set_result(result.content)
+        except Exception as e:
+            # Fallo del lote entero (credenciales, red, respuesta inesperada): los llamantes no esperan al timeout
+            print(f"Error generating batch: {str(e)}")
+            for _, future in batch:
+                if not future.done():
+                    self.metrics.increment('llm_batch_errors')
+                    future.set_exception(e)
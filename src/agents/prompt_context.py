@@ -0,0 +1,111 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Tuple
+
+from src.utils.metrics import MetricsRegistry, metrics as default_metrics
+
+# Orden de prioridad: con presupuesto escaso se descartan primero los últimos
+FIELD_PRIORITY = (
+    'vehicle_type',
+    'price_range',
+    'season',
+    'query_intent',
+    'duration_info',
+    'location_info',
+    'special_requirements',
+    'is_weekend'
+)
+
+# Campos que no aportan al LLM
+EXCLUDED_FIELDS = ('timestamp',)
+
+
+class PromptContextSerializer:
+    """
+    Serializa el contexto para el prompt con sólo los campos informados y un
+    presupuesto de tokens. El ahorro frente a str(context) se publica en los
+    contadores prompt_context_* del registro de métricas
+    """
+
+    def __init__(self, max_tokens: int = 200, encoding_name: str = "cl100k_base",
+                 metrics: MetricsRegistry = None):
+        self.max_tokens = max_tokens
+        self.encoding_name = encoding_name
+        self._encoding = None
+        self.metrics = metrics if metrics is not None else default_metrics
+
+    def serialize(self, context: Dict[str, Any]) -> str:
+        """Devuelve 'campo=valor; ...' respetando el presupuesto de tokens"""
+        parts, used = [], 0
+        dropped = 0
+        for key, value in self._fields(context):
+            part = f"{key}={value}"
+            cost = self.count_tokens(part) + (1 if parts else 0)
+            if used + cost > self.max_tokens:
+                dropped += 1
+                continue
+            parts.append(part)
+            used += cost
+
+        if self.metrics.enabled:
+            # Contar str(context) sólo sirve para medir el ahorro
+            raw_tokens = self.count_tokens(str(context))
+            self.metrics.increment('prompt_context_prompts')
+            self.metrics.increment('prompt_context_raw_tokens', raw_tokens)
+            self.metrics.increment('prompt_context_tokens', used)
+            self.metrics.increment('prompt_context_tokens_saved', raw_tokens - used)
+            self.metrics.increment('prompt_context_dropped_fields', dropped)
+        return "; ".join(parts)
+
+    def count_tokens(self, text: str) -> int:
+        encoding = self._get_encoding()
+        if encoding is None:
+            # Aproximación habitual si tiktoken no está disponible
+            return max(1, len(text) // 4)
+        return len(encoding.encode(text))
+
+    def _fields(self, context: Dict[str, Any]) -> List[Tuple[str, str]]:
+        context = context or {}
+        keys = [key for key in FIELD_PRIORITY if key in context]
+        keys += [key for key in context if key not in FIELD_PRIORITY and key not in EXCLUDED_FIELDS]
+
+        fields = []
+        for key in keys:
+            value = context[key]
+            if isinstance(value, dict):
+                # Los dicts anidados se aplanan; los booleanos se listan sólo si son ciertos
+                flags = [name for name, flag in value.items() if flag is True]
+                if flags and len(flags) == sum(1 for flag in value.values() if flag):
+                    fields.append((key, ",".join(flags)))
+                    continue
+                fields.extend(
+                    (name, self._format(item)) for name, item in value.items() if self._is_populated(item)
+                )
+            elif self._is_populated(value):
+                fields.append((key, self._format(value)))
+        return fields
+
+    @staticmethod
+    def _is_populated(value) -> bool:
+        return value is not None and value is not False and value != "" and value != [] and value != {}
+
+    @staticmethod
+    def _format(value) -> str:
+        if isinstance(value, Enum):
+            return str(value.value)
+        if isinstance(value, datetime):
+            return value.date().isoformat()
+        if isinstance(value, (list, tuple)):
+            return "-".join(str(item) for item in value)
+        if value is True:
+            return "sí"
+        return str(value)
+
+    def _get_encoding(self):
+        if self._encoding is None:
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(self.encoding_name)
+            except Exception:
+                self._encoding = False
+        return self._encoding or None
@@ -1,44 +1,212 @@
+import asyncio
+import copy
+import threading
+import time
 from enum import Enum
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, TYPE_CHECKING
 from datetime import datetime
 
-from langchain_community.chat_models import ChatOpenAI
 from sqlalchemy.orm import Session
-from langchain.prompts import ChatPromptTemplate
 
+from src.agents.llm_batcher import LLMBatcher
+from src.agents.prompt_context import PromptContextSerializer
+from src.agents.response_cache import ResponseCache
+from src.agents.streaming import ResponseStream
+from src.config import Config
 from src.context.context_builder import ContextBuilder
+from src.database.crud import reserve_ids
+from src.database.interaction_writer import InteractionWriter
 from src.database.models import Interaction
+from src.learning.success_analytics import BOOKING_WORD, complexity_level, sentiment_score
+from src.learning.template_registry import CompiledTemplate
+from src.retrieval.spec_retriever import SpecRetriever
+from src.utils.metrics import MetricsRegistry, metrics as default_metrics
+from src.utils.profiling import RequestProfiler
+
+if TYPE_CHECKING:
+    from langchain.prompts import ChatPromptTemplate
+
+CATEGORY_PROMPTS = {
+    'vehicle_info': """Eres un experto asesor de RentaCar. 
+    Proporciona información detallada sobre el vehículo solicitado.
+    Contexto del vehículo: {context}
+    Fichas técnicas relevantes: {specs}
+    Consulta: {query}
+    Responde de manera profesional y detallada, usando sólo los datos de las fichas técnicas.""",
+
+    'pricing': """Eres un asesor de ventas de RentaCar.
+    Proporciona información clara sobre precios y condiciones.
+    Contexto de la cotización: {context}
+    Consulta: {query}
+    Incluye información sobre tarifas, seguros y servicios adicionales.""",
+
+    'booking': """Eres un agente de reservas de RentaCar.
+    Ayuda al cliente con su reserva de vehículo.
+    Contexto de la reserva: {context}
+    Consulta: {query}
+    Guía al cliente en el proceso de reserva.""",
+
+    'damage': """Eres un especialista en evaluación de daños de RentaCar.
+    Analiza y responde consultas sobre daños en vehículos.
+    Contexto del incidente: {context}
+    Consulta: {query}
+    Proporciona información clara sobre el proceso de reporte de daños.""",
+
+    'claims': """Eres un agente de atención al cliente de RentaCar.
+    Atiende los reclamos y quejas de manera profesional.
+    Contexto del reclamo: {context}
+    Consulta: {query}
+    Ofrece soluciones y alternativas al cliente."""
+}
+
+DEFAULT_PROMPT = "Eres un asistente de RentaCar. Responde la siguiente consulta: {query}"
+
+NO_SPECS = "No disponibles"
+
+
+@lru_cache(maxsize=None)
+def _compiled_prompt(category: str) -> 'ChatPromptTemplate':
+    """
+    Compila una sola vez el ChatPromptTemplate de cada categoría
+    """
+    # Importaciones pesadas diferidas hasta la primera generación
+    from langchain.prompts import ChatPromptTemplate
+
+    return ChatPromptTemplate.from_template(CATEGORY_PROMPTS.get(category, DEFAULT_PROMPT))
+
+
+def _default_llm():
+    """
+    Cliente LLM por defecto, creado en su primer uso
+    """
+    from langchain_community.chat_models import ChatOpenAI
+
+    return ChatOpenAI(temperature=0.7)
+
 
 class RentaCarAgent:
-    def __init__(self, session: Session, response_optimizer):
+    def __init__(self, session: Session, response_optimizer, response_cache: ResponseCache = None,
+                 llm=None, batcher: LLMBatcher = None, interaction_writer: InteractionWriter = None,
+                 prompt_serializer: PromptContextSerializer = None, metrics: MetricsRegistry = None,
+                 profiler: RequestProfiler = None, retriever: SpecRetriever = None,
+                 raw_feedback: bool = None):
         self.session = session
         self.optimizer = response_optimizer
         self.context_builder = ContextBuilder()
-        self.llm = ChatOpenAI(temperature=0.7)
+        # Sin LLM explícito, el cliente por defecto se crea al necesitarlo por primera vez
+        self._llm = llm
+        self._llm_lock = threading.Lock()
+        # La sesión no es segura entre hilos: el camino asíncrono la usa en exclusión mutua
+        self._session_lock = threading.Lock()
+        self.response_cache = response_cache if response_cache is not None else ResponseCache(
+            max_size=Config.RESPONSE_CACHE_SIZE,
+            ttl=Config.RESPONSE_CACHE_TTL,
+            similarity_threshold=Config.RESPONSE_CACHE_SIMILARITY
+        )
+        # Tiempos por etapa y contadores; sin coste apreciable si está deshabilitado
+        self.metrics = metrics if metrics is not None else default_metrics
+        # Agrupa las generaciones concurrentes en llamadas batch al LLM
+        if batcher is None and Config.LLM_BATCHING:
+            batcher = LLMBatcher(
+                self.llm,
+                max_batch_size=Config.LLM_BATCH_MAX_SIZE,
+                max_wait=Config.LLM_BATCH_MAX_WAIT_MS / 1000,
+                request_timeout=Config.LLM_REQUEST_TIMEOUT,
+                metrics=self.metrics
+            )
+        self.batcher = batcher
+        # Registro diferido opcional de interacciones (inserciones masivas fuera del camino de la consulta)
+        self.interaction_writer = interaction_writer
+        # Contexto compacto para el prompt, limitado por tokens
+        self.prompt_serializer = prompt_serializer or PromptContextSerializer(
+            max_tokens=Config.PROMPT_CONTEXT_MAX_TOKENS,
+            metrics=self.metrics
+        )
+        # Perfilado muestreado de peticiones (opcional)
+        if profiler is None and Config.PROFILING_ENABLED:
+            profiler = RequestProfiler(
+                Config.PROFILE_DIR,
+                sample_rate=Config.PROFILE_SAMPLE_RATE,
+                slow_threshold_ms=Config.PROFILE_SLOW_MS,
+                trace_memory=Config.PROFILE_TRACE_MEMORY,
+                max_files=Config.PROFILE_MAX_FILES
+            )
+        self.profiler = profiler
+        # Recuperación de fichas técnicas para las consultas de vehículos
+        if retriever is None and Config.RETRIEVAL_ENABLED:
+            retriever = SpecRetriever()
+        self.retriever = retriever
+        # Feedback crudo: métricas de plantilla e indicadores se recalculan fuera de línea (MetricsRebuilder)
+        self.raw_feedback = Config.FEEDBACK_RAW_ONLY if raw_feedback is None else raw_feedback
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    self._llm = _default_llm()
+        return self._llm
+
+    def with_session(self, session: Session) -> 'RentaCarAgent':
+        """
+        Agente ligado a otra sesión (una por petición) que comparte el estado
+        pesado: la ventana del optimizador, el LLM, la caché y los matchers
+        """
+        # Resolver el LLM antes de copiar para que todas las peticiones compartan el cliente
+        self.llm
+        bound = copy.copy(self)
+        bound.session = session
+        bound.optimizer = self.optimizer.with_session(session)
+        bound._session_lock = threading.Lock()
+        return bound
 
     def process_query(self, query: str, additional_context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
         Procesa una consulta y genera una respuesta contextualizada
         """
+        if self.profiler is None:
+            return self._process_query(query, additional_context)
+        return self.profiler.run(self._process_query, query, additional_context)
+
+    def _process_query(self, query: str, additional_context: Dict[str, Any] = None,
+                       timings: Dict[str, float] = None) -> Dict[str, Any]:
+        """
+        Cuerpo de process_query; `timings` recoge la duración de cada etapa
+        """
+        metrics = self.metrics
+        started_at = time.perf_counter()
         try:
-            # Construir contexto
-            context = self.context_builder.build_context(query, additional_context)
+            with metrics.span('context', timings):
+                # Buscar las palabras clave una sola vez para contexto y categoría
+                keyword_match = self.context_builder.match_keywords(query)
+
+                # Construir contexto
+                context = self.context_builder.build_context(query, additional_context, keyword_match)
 
             # Categorizar la consulta
-            category = self.categorize_query(query)
+            with metrics.span('categorize', timings):
+                category = self.categorize_query(query, keyword_match)
 
             # Obtener la mejor plantilla basada en el histórico
-            template = self.optimizer.analyze_query(query, context)
+            with metrics.span('optimizer', timings):
+                template = self.optimizer.analyze_query(query, context)
 
             # Si no hay plantilla, crear una respuesta nueva
             if not template:
-                response = self._generate_new_response(query, category, context)
+                metrics.increment('new_generations')
+                with metrics.span('generate', timings):
+                    response = self._generate_new_response(query, category, context)
             else:
-                response = self._apply_template(template, context)
+                metrics.increment('template_hits')
+                with metrics.span('template', timings):
+                    response = self._apply_template(template, context, query)
 
             # Registrar la interacción
-            interaction = self._record_interaction(query, response, category, context, template)
+            with metrics.span('record', timings):
+                interaction = self._record_interaction(query, response, category, context, template)
 
+            metrics.observe('process_query', time.perf_counter() - started_at)
             return {
                 'response': response,
                 'interaction_id': interaction.id,
@@ -47,6 +215,7 @@ class RentaCarAgent:
             }
 
         except Exception as e:
+            metrics.increment('errors')
             print(f"Error processing query: {str(e)}")
             # Respuesta de fallback en caso de error
             return {
@@ -54,75 +223,270 @@ class RentaCarAgent:
                 'error': str(e)
             }
 
+    def process_query_stream(self, query: str, additional_context: Dict[str, Any] = None) -> ResponseStream:
+        """
+        Procesa una consulta devolviendo la respuesta por fragmentos a medida que
+        se generan. Al terminar el stream se registra la interacción con el tiempo
+        hasta el primer fragmento y el tiempo total, y el resultado queda en `result`
+        """
+        metrics = self.metrics
+        started_at = time.perf_counter()
+
+        def on_error(e: Exception):
+            metrics.increment('errors')
+            print(f"Error processing query: {str(e)}")
+            fallback = "Lo siento, estoy teniendo problemas para procesar tu consulta. ¿Podrías reformularla?"
+            return fallback, {'response': fallback, 'error': str(e)}
+
+        try:
+            with metrics.span('context'):
+                keyword_match = self.context_builder.match_keywords(query)
+                context = self.context_builder.build_context(query, additional_context, keyword_match)
+            with metrics.span('categorize'):
+                category = self.categorize_query(query, keyword_match)
+            with metrics.span('optimizer'):
+                template = self.optimizer.analyze_query(query, context)
+
+            metrics.increment('template_hits' if template else 'new_generations')
+            response = None
+            if template:
+                with metrics.span('template'):
+                    response = template.render(context)
+            if response is not None:
+                chunks = iter([response])
+            else:
+                # La generación avanza a medida que se consume el stream
+                chunks = self._timed_chunks('generate', self._stream_new_response(
+                    query, template.category_name if template else category, context))
+
+        except Exception as e:
+            fallback, result = on_error(e)
+            return ResponseStream(iter([fallback]), lambda *args: result, started_at=started_at)
+
+        def on_complete(response: str, time_to_first_token: float, generation_time: float):
+            with metrics.span('record'):
+                interaction = self._record_interaction(
+                    query, response, category, context, template,
+                    generation_metrics={
+                        'time_to_first_token': time_to_first_token,
+                        'generation_time': generation_time
+                    }
+                )
+            if time_to_first_token is not None:
+                metrics.observe('time_to_first_token', time_to_first_token)
+            metrics.observe('process_query', time.perf_counter() - started_at)
+            return {
+                'response': response,
+                'interaction_id': interaction.id,
+                'category': category,
+                'context': self._serialize_context(context),
+                'time_to_first_token': time_to_first_token,
+                'generation_time': generation_time
+            }
+
+        return ResponseStream(chunks, on_complete, on_error, started_at)
+
+    def _timed_chunks(self, stage: str, chunks):
+        """Mide como etapa `stage` el tiempo hasta agotar los fragmentos"""
+        with self.metrics.span(stage):
+            yield from chunks
+
+    def _stream_new_response(self, query: str, category: str, context: Dict[str, Any]):
+        """
+        Versión en streaming de _generate_new_response
+        """
+        cached_response = self._cached_response(query, category, context)
+        if cached_response is not None:
+            yield cached_response
+            return
+
+        parts = []
+        with self.metrics.span('llm'):
+            for chunk in self.llm.stream(self._build_prompt(query, category, context)):
+                text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                parts.append(text)
+                yield text
+
+        self.response_cache.put(query, category, context, "".join(parts))
+
+    async def process_query_async(self, query: str, additional_context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Versión asíncrona de process_query: la llamada al LLM y el acceso a la base
+        de datos no bloquean el bucle de eventos, de modo que un solo proceso puede
+        atender muchas consultas concurrentes
+        """
+        metrics = self.metrics
+        started_at = time.perf_counter()
+        try:
+            with metrics.span('context'):
+                keyword_match = self.context_builder.match_keywords(query)
+
+                # Construir contexto mientras se refresca la ventana del optimizador
+                context, _ = await asyncio.gather(
+                    asyncio.to_thread(self.context_builder.build_context, query, additional_context, keyword_match),
+                    self._run_in_session(self.optimizer.refresh)
+                )
+
+            # Categorizar la consulta
+            with metrics.span('categorize'):
+                category = self.categorize_query(query, keyword_match)
+
+            # Obtener la mejor plantilla basada en el histórico
+            with metrics.span('optimizer'):
+                template = await self._run_in_session(self.optimizer.analyze_query, query, context)
+
+            # Si no hay plantilla, crear una respuesta nueva
+            if not template:
+                metrics.increment('new_generations')
+                with metrics.span('generate'):
+                    response = await self._agenerate_new_response(query, category, context)
+            else:
+                metrics.increment('template_hits')
+                with metrics.span('template'):
+                    response = await self._aapply_template(template, context, query)
+
+            # Registrar la interacción; los atributos ORM sólo se leen dentro de la sesión
+            with metrics.span('record'):
+                interaction_id = await self._run_in_session(
+                    lambda: self._record_interaction(query, response, category, context, template).id
+                )
+
+            metrics.observe('process_query', time.perf_counter() - started_at)
+            return {
+                'response': response,
+                'interaction_id': interaction_id,
+                'category': category,
+                'context': self._serialize_context(context)
+            }
+
+        except Exception as e:
+            metrics.increment('errors')
+            print(f"Error processing query: {str(e)}")
+            return {
+                'response': "Lo siento, estoy teniendo problemas para procesar tu consulta. ¿Podrías reformularla?",
+                'error': str(e)
+            }
+
+    async def process_feedback_async(self, interaction_id: int,
+                                     feedback_score: float,
+                                     comments: str = None) -> bool:
+        """
+        Versión asíncrona de process_feedback
+        """
+        return await self._run_in_session(self.process_feedback, interaction_id, feedback_score, comments)
+
+    async def _run_in_session(self, func, *args):
+        """
+        Ejecuta una operación de base de datos en un hilo, serializando el uso de la sesión
+        """
+        def run():
+            with self._session_lock:
+                return func(*args)
+
+        return await asyncio.to_thread(run)
+
     def _generate_new_response(self, query: str, category: str, context: Dict[str, Any]) -> str:
         """
         Genera una nueva respuesta cuando no hay plantilla disponible
         """
-        # Definir prompts específicos por categoría
-        category_prompts = {
-            'vehicle_info': """Eres un experto asesor de RentaCar. 
-            Proporciona información detallada sobre el vehículo solicitado.
-            Contexto del vehículo: {context}
-            Consulta: {query}
-            Responde de manera profesional y detallada.""",
-
-            'pricing': """Eres un asesor de ventas de RentaCar.
-            Proporciona información clara sobre precios y condiciones.
-            Contexto de la cotización: {context}
-            Consulta: {query}
-            Incluye información sobre tarifas, seguros y servicios adicionales.""",
-
-            'booking': """Eres un agente de reservas de RentaCar.
-            Ayuda al cliente con su reserva de vehículo.
-            Contexto de la reserva: {context}
-            Consulta: {query}
-            Guía al cliente en el proceso de reserva.""",
-
-            'damage': """Eres un especialista en evaluación de daños de RentaCar.
-            Analiza y responde consultas sobre daños en vehículos.
-            Contexto del incidente: {context}
-            Consulta: {query}
-            Proporciona información clara sobre el proceso de reporte de daños.""",
-
-            'claims': """Eres un agente de atención al cliente de RentaCar.
-            Atiende los reclamos y quejas de manera profesional.
-            Contexto del reclamo: {context}
-            Consulta: {query}
-            Ofrece soluciones y alternativas al cliente."""
-        }
+        # Consultas equivalentes en el mismo contexto reutilizan la respuesta
+        cached_response = self._cached_response(query, category, context)
+        if cached_response is not None:
+            return cached_response
 
-        # Obtener el prompt adecuado para la categoría
-        prompt_template = category_prompts.get(
-            category,
-            "Eres un asistente de RentaCar. Responde la siguiente consulta: {query}"
-        )
+        # Generar la respuesta
+        messages = self._build_prompt(query, category, context)
+        with self.metrics.span('llm'):
+            if self.batcher is not None:
+                text = self.batcher.generate(messages)
+            else:
+                response = self.llm.generate([messages])
+                text = response.generations[0][0].text
+        self.response_cache.put(query, category, context, text)
+        return text
 
-        # Crear el prompt
-        prompt = ChatPromptTemplate.from_template(prompt_template)
+    async def _agenerate_new_response(self, query: str, category: str, context: Dict[str, Any]) -> str:
+        """
+        Versión asíncrona de _generate_new_response
+        """
+        cached_response = self._cached_response(query, category, context)
+        if cached_response is not None:
+            return cached_response
+
+        # La recuperación de fichas es bloqueante: fuera del bucle de eventos
+        messages = await asyncio.to_thread(self._build_prompt, query, category, context)
+        with self.metrics.span('llm'):
+            if self.batcher is not None:
+                text = await self.batcher.agenerate(messages)
+            else:
+                response = await self.llm.agenerate([messages])
+                text = response.generations[0][0].text
+        self.response_cache.put(query, category, context, text)
+        return text
 
-        # Generar la respuesta
-        response = self.llm.generate([prompt.format_messages(
-            query=query,
-            context=str(context)
-        )])
+    def _cached_response(self, query: str, category: str, context: Dict[str, Any]):
+        """
+        Busca la respuesta en la caché contabilizando aciertos y fallos
+        """
+        cached_response = self.response_cache.get(query, category, context)
+        self.metrics.increment('cache_hits' if cached_response is not None else 'cache_misses')
+        return cached_response
 
-        return response.generations[0][0].text
+    def _build_prompt(self, query: str, category: str, context: Dict[str, Any]):
+        """
+        Construye los mensajes del prompt para la categoría de la consulta
+        """
+        prompt = _compiled_prompt(category)
+        variables = {
+            'query': query,
+            'context': self.prompt_serializer.serialize(context)
+        }
+        if 'specs' in prompt.input_variables:
+            variables['specs'] = self._retrieve_specs(query)
+        return prompt.format_messages(**variables)
 
-    def _apply_template(self, template: str, context: Dict[str, Any]) -> str:
+    def _retrieve_specs(self, query: str) -> str:
         """
-        Aplica una plantilla existente con el contexto actual
+        Fragmentos de fichas técnicas relevantes para la consulta; un fallo en
+        la recuperación no impide responder
         """
+        if self.retriever is None or not query:
+            return NO_SPECS
         try:
-            # Reemplazar placeholders en la plantilla
-            response = template.template.format(**context)
-            return response
-        except KeyError:
-            # Si hay error con la plantilla, generar respuesta nueva
+            with self.metrics.span('retrieval'):
+                return self.retriever.format_specs(query) or NO_SPECS
+        except Exception as e:
+            self.metrics.increment('retrieval_errors')
+            print(f"Error retrieving specs: {str(e)}")
+            return NO_SPECS
+
+    def _apply_template(self, template: CompiledTemplate, context: Dict[str, Any], query: str = "") -> str:
+        """
+        Aplica una plantilla existente con el contexto actual
+        """
+        # El optimizador ya descarta las plantillas que el contexto no cubre
+        response = template.render(context)
+        if response is None:
+            # Si hay error con la plantilla, generar respuesta nueva para la consulta
             return self._generate_new_response(
-                query="",  # Query vacío porque estamos usando el contexto
-                category=template.category.name,
+                query=query,
+                category=template.category_name,
+                context=context
+            )
+        return response
+
+    async def _aapply_template(self, template: CompiledTemplate, context: Dict[str, Any], query: str = "") -> str:
+        """
+        Versión asíncrona de _apply_template
+        """
+        response = template.render(context)
+        if response is None:
+            return await self._agenerate_new_response(
+                query=query,
+                category=template.category_name,
                 context=context
             )
+        return response
 
     def _serialize_context(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -140,13 +504,14 @@ class RentaCarAgent:
 
     def _record_interaction(self, query: str, response: str,
                             category: str, context: Dict[str, Any],
-                            template: Any = None) -> Any:
+                            template: Any = None,
+                            generation_metrics: Dict[str, float] = None) -> Any:
         """
         Registra la interacción en la base de datos
         """
         serialized_context = self._serialize_context(context)
 
-        interaction = Interaction(
+        fields = dict(
             query=query,
             response=response,
             category_id=category,
@@ -154,6 +519,15 @@ class RentaCarAgent:
             context=serialized_context,
             timestamp=datetime.utcnow()  # Mantener como datetime
         )
+        if generation_metrics:
+            fields.update(generation_metrics)
+
+        # Con escritura diferida el ID se asigna al momento y la fila se inserta en bloque
+        if self.interaction_writer is not None:
+            return self.interaction_writer.record(**fields)
+
+        # El ID se reserva como en el registro diferido para no pisar sus bloques
+        interaction = Interaction(id=reserve_ids(self.session, Interaction), **fields)
 
         self.session.add(interaction)
         self.session.flush()
@@ -163,11 +537,28 @@ class RentaCarAgent:
 
     def process_feedback(self, interaction_id: int,
                          feedback_score: float,
-                         comments: str = None) -> bool:
+                         comments: str = None,
+                         raise_errors: bool = False) -> bool:
         """
-        Procesa el feedback de una interacción
+        Procesa el feedback de una interacción. Devuelve False si la interacción
+        no existe; los errores también devuelven False salvo con raise_errors
         """
         try:
+            # Las interacciones aún en el buffer de escritura se actualizan en memoria
+            if self.interaction_writer is not None:
+                interaction = self.interaction_writer.update_pending(
+                    interaction_id,
+                    lambda row: self._apply_pending_feedback(row, feedback_score, comments)
+                )
+                if interaction is not None:
+                    if interaction.template_id and not self.raw_feedback:
+                        self.optimizer.update_template_metrics(
+                            interaction.template_id,
+                            feedback_score
+                        )
+                    self.optimizer.add_interaction(interaction)
+                    return True
+
             interaction = self.session.get(Interaction, interaction_id)
             if not interaction:
                 return False
@@ -175,32 +566,53 @@ class RentaCarAgent:
             # Actualizar la interacción con el feedback
             interaction.feedback_score = feedback_score
             interaction.feedback_comments = comments
+            interaction.feedback_timestamp = datetime.utcnow()
 
-            # Actualizar métricas de la plantilla si existe
-            if interaction.template_id:
-                self.optimizer.update_template_metrics(
-                    interaction.template_id,
-                    feedback_score
-                )
+            if not self.raw_feedback:
+                # Actualizar métricas de la plantilla si existe
+                if interaction.template_id:
+                    self.optimizer.update_template_metrics(
+                        interaction.template_id,
+                        feedback_score
+                    )
 
-            # Analizar indicadores de éxito
-            success_indicators = self._analyze_success_indicators(interaction)
-            interaction.success_indicators = success_indicators
+                # Analizar indicadores de éxito
+                success_indicators = self._analyze_success_indicators(interaction)
+                interaction.success_indicators = success_indicators
 
             self.session.commit()
+
+            # Incorporar la interacción al índice del optimizador si fue exitosa
+            self.optimizer.add_interaction(interaction)
             return True
 
         except Exception as e:
+            self.metrics.increment('errors')
             print(f"Error processing feedback: {str(e)}")
+            if raise_errors:
+                raise
             return False
 
+    def _apply_pending_feedback(self, row: Dict[str, Any], feedback_score: float, comments: str) -> Interaction:
+        """
+        Añade el feedback a una fila pendiente de volcado y devuelve su vista como Interaction
+        """
+        row.update(
+            feedback_score=feedback_score,
+            feedback_comments=comments,
+            feedback_timestamp=datetime.utcnow()
+        )
+        if not self.raw_feedback:
+            row['success_indicators'] = self._analyze_success_indicators(Interaction(**row))
+        return Interaction(**row)
+
     def _analyze_success_indicators(self, interaction: Any) -> Dict[str, Any]:
         """
         Analiza indicadores de éxito de la interacción
         """
         return {
             'response_time': (datetime.utcnow() - interaction.timestamp).total_seconds(),
-            'led_to_booking': 'reserva' in interaction.response.lower(),
+            'led_to_booking': BOOKING_WORD in interaction.response.lower(),
             'required_followup': False,  # Por defecto
             'sentiment_score': self._analyze_sentiment(interaction.response),
             'complexity_level': self._calculate_complexity(interaction.query, interaction.response)
@@ -210,47 +622,16 @@ class RentaCarAgent:
         """
         Analiza el sentimiento de un texto (implementación básica)
         """
-        positive_words = ['gracias', 'excelente', 'perfecto', 'genial', 'ayuda']
-        negative_words = ['problema', 'error', 'mal', 'queja', 'insatisfecho']
-
-        text = text.lower()
-        positive_count = sum(1 for word in positive_words if word in text)
-        negative_count = sum(1 for word in negative_words if word in text)
-
-        total = positive_count + negative_count
-        if total == 0:
-            return 0.5
-
-        return positive_count / total
+        return sentiment_score(text)
 
     def _calculate_complexity(self, query: str, response: str) -> str:
         """
         Calcula la complejidad de la interacción
         """
-        query_length = len(query.split())
-        response_length = len(response.split())
-
-        if response_length < 20:
-            return 'simple'
-        elif response_length < 50:
-            return 'medium'
-        else:
-            return 'complex'
+        return complexity_level(response)
 
-    def categorize_query(self, query: str) -> str:
+    def categorize_query(self, query: str, keyword_match=None) -> str:
         """
         Categorizes the query into predefined categories.
         """
-        query = query.lower()
-        if any(keyword in query for keyword in ['precio', 'tarifa', 'costo']):
-            return 'pricing'
-        elif any(keyword in query for keyword in ['reservar', 'reserva', 'booking']):
-            return 'booking'
-        elif any(keyword in query for keyword in ['vehículo', 'coche', 'auto']):
-            return 'vehicle_info'
-        elif any(keyword in query for keyword in ['daño', 'accidente', 'reparación']):
-            return 'damage'
-        elif any(keyword in query for keyword in ['reclamo', 'queja', 'problema']):
-            return 'claims'
-        else:
-            return 'general'
\ No newline at end of file
+        return self.context_builder.categorize(query, keyword_match)
\ No newline at end of file
@@ -0,0 +1,134 @@
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from enum import Enum
+from typing import Dict, Any, Optional
+
+
+class ResponseCache:
+    """Caché LRU con expiración para respuestas generadas por el LLM"""
+
+    # Campos del contexto que cambian la respuesta esperada
+    CONTEXT_FIELDS = ('vehicle_type', 'season', 'price_range')
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600.0,
+                 similarity_threshold: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        # Si se define, acepta consultas con similitud de Jaccard >= umbral en el mismo contexto
+        self.similarity_threshold = similarity_threshold
+
+        self._entries = OrderedDict()  # clave -> (respuesta, expiración, tokens)
+        self._buckets = {}  # (categoría, contexto) -> claves de esa partición
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, query: str, category: str, context: Dict[str, Any]) -> Optional[str]:
+        """Devuelve la respuesta cacheada para la consulta, o None"""
+        normalized = self.normalize_query(query)
+        bucket = self._bucket_key(category, context)
+        key = bucket + (normalized,)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._live_entry(key, now)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            if self.similarity_threshold is not None:
+                similar_key = self._find_similar(bucket, set(normalized.split()), now)
+                if similar_key is not None:
+                    self._entries.move_to_end(similar_key)
+                    self.similar_hits += 1
+                    return self._entries[similar_key][0]
+
+            self.misses += 1
+            return None
+
+    def put(self, query: str, category: str, context: Dict[str, Any], response: str):
+        """Almacena una respuesta, desalojando la menos usada si se supera el tamaño"""
+        normalized = self.normalize_query(query)
+        bucket = self._bucket_key(category, context)
+        key = bucket + (normalized,)
+
+        with self._lock:
+            self._entries[key] = (response, time.monotonic() + self.ttl, frozenset(normalized.split()))
+            self._entries.move_to_end(key)
+            self._buckets.setdefault(bucket, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso de la caché"""
+        lookups = self.hits + self.similar_hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'similar_hits': self.similar_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits + self.similar_hits) / lookups if lookups else 0.0
+        }
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Minúsculas, sin tildes, sin puntuación y con espacios colapsados"""
+        text = unicodedata.normalize('NFKD', (query or '').lower())
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+        text = re.sub(r'[^\w\s]', ' ', text)
+        return ' '.join(text.split())
+
+    def _bucket_key(self, category: str, context: Dict[str, Any]) -> tuple:
+        context = context or {}
+        return (category,) + tuple(self._hashable(context.get(field)) for field in self.CONTEXT_FIELDS)
+
+    def _hashable(self, value):
+        if isinstance(value, Enum):
+            return value.name
+        if isinstance(value, (list, tuple)):
+            return tuple(self._hashable(item) for item in value)
+        if isinstance(value, dict):
+            return tuple(sorted((key, self._hashable(item)) for key, item in value.items()))
+        return value
+
+    def _live_entry(self, key, now: float):
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] <= now:
+            self._remove(key)
+            return None
+        return entry
+
+    def _find_similar(self, bucket: tuple, tokens: set, now: float):
+        best_key, best_score = None, self.similarity_threshold
+        for key in list(self._buckets.get(bucket, ())):
+            entry = self._live_entry(key, now)
+            if entry is None or not tokens:
+                continue
+            score = len(tokens & entry[2]) / len(tokens | entry[2])
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        bucket = self._buckets.get(key[:-1])
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[key[:-1]]
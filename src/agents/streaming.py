@@ -0,0 +1,58 @@
+import time
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+
+class ResponseStream:
+    """
+    Iterable de fragmentos de respuesta. Mide el tiempo hasta el primer
+    fragmento y el tiempo total, y al agotarse entrega el texto completo a
+    `on_complete`, cuyo resultado queda disponible en `result`. Los errores
+    de la generación y de `on_complete` se pasan a `on_error`
+    """
+
+    def __init__(self, chunks: Iterator[str],
+                 on_complete: Callable[[str, Optional[float], float], Dict[str, Any]],
+                 on_error: Callable[[Exception], Tuple[str, Dict[str, Any]]] = None,
+                 started_at: float = None):
+        self._chunks = chunks
+        self._on_complete = on_complete
+        self._on_error = on_error
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+        self.time_to_first_token = None
+        self.generation_time = None
+        self.result = None
+        self._consumed = False
+
+    def __iter__(self):
+        if self._consumed:
+            raise RuntimeError("El stream de respuesta ya fue consumido")
+        self._consumed = True
+
+        parts = []
+        try:
+            for chunk in self._chunks:
+                if not chunk:
+                    continue
+                if self.time_to_first_token is None:
+                    self.time_to_first_token = time.perf_counter() - self.started_at
+                parts.append(chunk)
+                yield chunk
+        except Exception as e:
+            if self._on_error is None:
+                raise
+            fallback, self.result = self._on_error(e)
+            yield fallback
+            return
+
+        self.generation_time = time.perf_counter() - self.started_at
+        try:
+            self.result = self._on_complete("".join(parts), self.time_to_first_token, self.generation_time)
+        except Exception as e:
+            if self._on_error is None:
+                raise
+            # La respuesta ya se ha entregado completa: el error sólo queda en `result`
+            _, self.result = self._on_error(e)
+
+    def text(self) -> str:
+        """Consume el stream y devuelve la respuesta completa"""
+        return "".join(self)
@@ -10,16 +10,83 @@ class Config:
 
     # Database
     DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///rentacar.db")
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", "30"))  # Segundos
+
+    # Interaction archive
+    ARCHIVE_PATH = os.getenv("ARCHIVE_PATH", "data/archive/interactions/")
+    # Días que permanecen en la tabla; debe cubrir la ventana del optimizador y el feedback tardío
+    ARCHIVE_HOT_DAYS = int(os.getenv("ARCHIVE_HOT_DAYS", "90"))
+
+    # Feedback
+    # Sólo se guarda el feedback crudo; métricas e indicadores se recalculan con success_analytics
+    FEEDBACK_RAW_ONLY = os.getenv("FEEDBACK_RAW_ONLY", "false").lower() == "true"
 
     # Paths
     VEHICLE_IMAGES_PATH = "data/vehicles/images/"
     VEHICLE_SPECS_PATH = "data/vehicles/specs/"
     DAMAGE_REPORTS_PATH = "data/vehicles/damage_reports/"
 
+    # Document ingestion
+    INGEST_PROCESSES = int(os.getenv("INGEST_PROCESSES", "0"))  # 0 usa todos los núcleos
+    DOCUMENT_CHUNK_SIZE = int(os.getenv("DOCUMENT_CHUNK_SIZE", "1000"))  # Caracteres
+    DOCUMENT_CHUNK_OVERLAP = int(os.getenv("DOCUMENT_CHUNK_OVERLAP", "150"))
+
+    # Retrieval
+    RETRIEVAL_ENABLED = os.getenv("RETRIEVAL_ENABLED", "false").lower() == "true"
+    RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+    VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", "data/vector_store/")
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.sqlite")
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+    # Image ingestion
+    THUMBNAILS_PATH = "data/vehicles/thumbnails/"
+    IMAGE_MANIFEST_PATH = "data/vehicles/.image_manifest.json"
+    IMAGE_THUMBNAIL_SIZE = int(os.getenv("IMAGE_THUMBNAIL_SIZE", "256"))  # Lado mayor en píxeles
+    IMAGE_DUPLICATE_DISTANCE = int(os.getenv("IMAGE_DUPLICATE_DISTANCE", "6"))  # Bits de Hamming del pHash
+
     # Model Configurations
     LLM_MODEL = "gpt-4o-mini"
     TEMPERATURE = 0.7
     MAX_TOKENS = 2000
+    # "openai" o "stub" (LLM local con latencia simulada, para pruebas de carga)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+    STUB_LLM_LATENCY = float(os.getenv("STUB_LLM_LATENCY", "0.5"))
+
+    # Prompt context
+    PROMPT_CONTEXT_MAX_TOKENS = int(os.getenv("PROMPT_CONTEXT_MAX_TOKENS", "200"))
+
+    # Response Cache
+    RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0")) or None
+
+    # LLM Batching
+    LLM_BATCHING = os.getenv("LLM_BATCHING", "false").lower() == "true"
+    LLM_BATCH_MAX_SIZE = int(os.getenv("LLM_BATCH_MAX_SIZE", "16"))
+    LLM_BATCH_MAX_WAIT_MS = float(os.getenv("LLM_BATCH_MAX_WAIT_MS", "20"))
+    LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+
+    # API
+    API_HOST = os.getenv("API_HOST", "0.0.0.0")
+    API_PORT = int(os.getenv("API_PORT", "8000"))
+    API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+
+    # Metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 desactiva el endpoint /metrics
+    METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "0"))  # 0 desactiva el log periódico
+
+    # Profiling
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles/")
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0.001"))
+    PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))  # 0 desactiva el registro de peticiones lentas
+    PROFILE_TRACE_MEMORY = os.getenv("PROFILE_TRACE_MEMORY", "false").lower() == "true"
+    PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
 
     # Business Rules
     BUSINESS_HOURS = {
@@ -1,10 +1,14 @@
 # src/context/context_builder.py
 
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, Iterator, Tuple, Union
 from datetime import datetime
+from itertools import islice
 import re
 from enum import Enum
 
+from src.context.keyword_matcher import KeywordMatch, KeywordMatcher
+from src.utils.helpers import process_map
+
 class VehicleType(Enum):
     COMPACT = "compact"
     SEDAN = "sedan"
@@ -22,6 +26,26 @@ class PriceRange(Enum):
     MEDIUM = "medium"
     PREMIUM = "premium"
 
+# Patrones para detectar ubicaciones, compilados una sola vez
+PICKUP_PATTERNS = [
+    re.compile(r'retirar en (.+?)(?=\s+y|\s+hasta|$)', re.IGNORECASE),
+    re.compile(r'desde (.+?)(?=\s+hasta|$)', re.IGNORECASE)
+]
+RETURN_PATTERNS = [
+    re.compile(r'devolver en (.+?)(?=\s+y|\s+desde|$)', re.IGNORECASE),
+    re.compile(r'hasta (.+?)(?=\s+desde|$)', re.IGNORECASE)
+]
+
+# Patrones para detectar duración y su equivalencia en días
+DURATION_PATTERNS = [
+    (re.compile(r'(\d+)\s*(?:día|dias|día)', re.IGNORECASE), 1),
+    (re.compile(r'(\d+)\s*(?:semana|semanas)', re.IGNORECASE), 7),
+    (re.compile(r'(\d+)\s*(?:mes|meses)', re.IGNORECASE), 30)
+]
+
+QueryItem = Union[str, Tuple[str, Dict[str, Any]]]
+
+
 class ContextBuilder:
     def __init__(self):
         # Palabras clave para identificar contextos específicos de RentaCar
@@ -39,6 +63,39 @@ class ContextBuilder:
             PriceRange.PREMIUM: ["premium", "caro", "alto"]
         }
 
+        self.intent_keywords = {
+            'cotización': ['precio', 'costo', 'tarifa', 'cuánto cuesta'],
+            'reserva': ['reservar', 'alquilar', 'rentar', 'disponible'],
+            'información': ['características', 'especificaciones', 'tiene'],
+            'reclamo': ['problema', 'queja', 'reclamo', 'mal'],
+            'daños': ['daño', 'golpe', 'accidente', 'rayón']
+        }
+
+        self.requirement_keywords = {
+            'gps': ['gps', 'navegador', 'navegación'],
+            'child_seat': ['silla', 'asiento', 'niño', 'bebé'],
+            'additional_driver': ['conductor adicional', 'segundo conductor'],
+            'insurance': ['seguro', 'cobertura'],
+            'automatic': ['automático', 'automática']
+        }
+
+        self.category_keywords = {
+            'pricing': ['precio', 'tarifa', 'costo'],
+            'booking': ['reservar', 'reserva', 'booking'],
+            'vehicle_info': ['vehículo', 'coche', 'auto'],
+            'damage': ['daño', 'accidente', 'reparación'],
+            'claims': ['reclamo', 'queja', 'problema']
+        }
+
+        # Todas las tablas se compilan en un único buscador de una sola pasada
+        self.keyword_matcher = KeywordMatcher({
+            'vehicle': self.vehicle_keywords,
+            'price': self.price_keywords,
+            'intent': self.intent_keywords,
+            'requirement': self.requirement_keywords,
+            'category': self.category_keywords
+        })
+
         # Definir temporadas
         self.season_dates = {
             Season.HIGH: [(12, 15, 1, 31),  # Verano
@@ -49,17 +106,72 @@ class ContextBuilder:
                         (8, 1, 10, 31)]
         }
 
-    def build_context(self, query: str, additional_context: Dict[str, Any] = None) -> Dict[str, Any]:
+    def build_context(self, query: str, additional_context: Dict[str, Any] = None,
+                      keyword_match: KeywordMatch = None) -> Dict[str, Any]:
+        return self._build_context(query, additional_context, keyword_match, self._time_context())
+
+    def build_contexts(self, queries: Iterable[QueryItem], reference_date: datetime = None,
+                       batch_size: int = 1000, processes: int = None) -> Iterator[Dict[str, Any]]:
+        """
+        Construye contextos de forma perezosa para un iterable de consultas
+        (o tuplas (consulta, contexto adicional)), conservando el orden.
+        Los campos temporales se calculan una vez por lote, o una sola vez si
+        se indica reference_date; con processes > 1 los lotes se reparten en
+        un pool de procesos
+        """
+        batches = self._batches(queries, batch_size)
+        if not processes or processes <= 1:
+            for batch in batches:
+                yield from self._build_batch(batch, self._time_context(reference_date))
+            return
+
+        # Como mucho dos lotes por proceso en vuelo para no materializar la entrada
+        for _, contexts, error in process_map(_build_context_batch, batches, processes,
+                                              lambda batch: (batch, self._time_context(reference_date))):
+            if error is not None:
+                raise error
+            yield from contexts
+
+    def _build_batch(self, batch, time_context: Dict[str, Any]):
+        for item in batch:
+            query, additional_context = (item, None) if isinstance(item, str) else item
+            yield self._build_context(query, additional_context, None, time_context)
+
+    @staticmethod
+    def _batches(queries: Iterable[QueryItem], batch_size: int):
+        iterator = iter(queries)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def _time_context(self, reference_date: datetime = None) -> Dict[str, Any]:
+        """
+        Campos que sólo dependen de la fecha: se calculan una vez y se comparten
+        """
+        now = reference_date or datetime.now()
+        return {
+            'timestamp': now,
+            'season': self._get_current_season(now),
+            'is_weekend': self._is_weekend(now)
+        }
+
+    def _build_context(self, query: str, additional_context: Dict[str, Any],
+                       keyword_match: KeywordMatch, time_context: Dict[str, Any]) -> Dict[str, Any]:
+        # Una sola pasada sobre la consulta para todas las tablas de palabras clave
+        keyword_match = keyword_match or self.match_keywords(query)
+
         context = {
-            'timestamp': datetime.now(),
-            'vehicle_type': self._detect_vehicle_type(query),
-            'price_range': self._detect_price_range(query),
-            'season': self._get_current_season(),
-            'is_weekend': self._is_weekend(),
-            'query_intent': self._detect_intent(query),
+            'timestamp': time_context['timestamp'],
+            'vehicle_type': self._detect_vehicle_type(query, keyword_match),
+            'price_range': self._detect_price_range(query, keyword_match),
+            'season': time_context['season'],
+            'is_weekend': time_context['is_weekend'],
+            'query_intent': self._detect_intent(query, keyword_match),
             'location_info': self._extract_location(query),
             'duration_info': self._extract_duration(query),
-            'special_requirements': self._extract_special_requirements(query)
+            'special_requirements': self._extract_special_requirements(query, keyword_match)
         }
 
         if additional_context:
@@ -68,31 +180,38 @@ class ContextBuilder:
         return context
 
 
-    def _detect_vehicle_type(self, query: str) -> VehicleType:
+    def match_keywords(self, query: str) -> KeywordMatch:
+        """
+        Busca todas las palabras clave conocidas en la consulta
+        """
+        return self.keyword_matcher.match(query)
+
+    def categorize(self, query: str, keyword_match: KeywordMatch = None) -> str:
+        """
+        Categoriza la consulta según las palabras clave de categoría
+        """
+        keyword_match = keyword_match or self.match_keywords(query)
+        return keyword_match.first('category', 'general')
+
+    def _detect_vehicle_type(self, query: str, keyword_match: KeywordMatch = None) -> VehicleType:
         """
         Detecta el tipo de vehículo mencionado en la consulta
         """
-        query = query.lower()
-        for vehicle_type, keywords in self.vehicle_keywords.items():
-            if any(keyword in query for keyword in keywords):
-                return vehicle_type
-        return None
+        keyword_match = keyword_match or self.match_keywords(query)
+        return keyword_match.first('vehicle')
 
-    def _detect_price_range(self, query: str) -> PriceRange:
+    def _detect_price_range(self, query: str, keyword_match: KeywordMatch = None) -> PriceRange:
         """
         Detecta el rango de precio mencionado en la consulta
         """
-        query = query.lower()
-        for price_range, keywords in self.price_keywords.items():
-            if any(keyword in query for keyword in keywords):
-                return price_range
-        return PriceRange.MEDIUM  # Default a rango medio
+        keyword_match = keyword_match or self.match_keywords(query)
+        return keyword_match.first('price', PriceRange.MEDIUM)  # Default a rango medio
 
-    def _get_current_season(self) -> Season:
+    def _get_current_season(self, current_date: datetime = None) -> Season:
         """
         Determina la temporada actual basada en la fecha
         """
-        current_date = datetime.now()
+        current_date = current_date or datetime.now()
         month, day = current_date.month, current_date.day
 
         for season, date_ranges in self.season_dates.items():
@@ -101,23 +220,12 @@ class ContextBuilder:
                     return season
         return Season.LOW
 
-    def _detect_intent(self, query: str) -> str:
+    def _detect_intent(self, query: str, keyword_match: KeywordMatch = None) -> str:
         """
         Detecta la intención principal de la consulta
         """
-        intents = {
-            'cotización': ['precio', 'costo', 'tarifa', 'cuánto cuesta'],
-            'reserva': ['reservar', 'alquilar', 'rentar', 'disponible'],
-            'información': ['características', 'especificaciones', 'tiene'],
-            'reclamo': ['problema', 'queja', 'reclamo', 'mal'],
-            'daños': ['daño', 'golpe', 'accidente', 'rayón']
-        }
-
-        query = query.lower()
-        for intent, keywords in intents.items():
-            if any(keyword in query for keyword in keywords):
-                return intent
-        return 'información'  # Intent por defecto
+        keyword_match = keyword_match or self.match_keywords(query)
+        return keyword_match.first('intent', 'información')  # Intent por defecto
 
     def _extract_location(self, query: str) -> Dict[str, str]:
         """
@@ -128,24 +236,14 @@ class ContextBuilder:
             'return_location': None
         }
 
-        # Patrones para detectar ubicaciones
-        pickup_patterns = [
-            r'retirar en (.+?)(?=\s+y|\s+hasta|$)',
-            r'desde (.+?)(?=\s+hasta|$)'
-        ]
-        return_patterns = [
-            r'devolver en (.+?)(?=\s+y|\s+desde|$)',
-            r'hasta (.+?)(?=\s+desde|$)'
-        ]
-
-        for pattern in pickup_patterns:
-            match = re.search(pattern, query, re.IGNORECASE)
+        for pattern in PICKUP_PATTERNS:
+            match = pattern.search(query)
             if match:
                 location_info['pickup_location'] = match.group(1).strip()
                 break
 
-        for pattern in return_patterns:
-            match = re.search(pattern, query, re.IGNORECASE)
+        for pattern in RETURN_PATTERNS:
+            match = pattern.search(query)
             if match:
                 location_info['return_location'] = match.group(1).strip()
                 break
@@ -162,58 +260,28 @@ class ContextBuilder:
             'duration_days': None
         }
 
-        # Patrones para detectar duración
-        duration_patterns = [
-            r'(\d+)\s*(?:día|dias|día)',
-            r'(\d+)\s*(?:semana|semanas)',
-            r'(\d+)\s*(?:mes|meses)'
-        ]
-
-        for pattern in duration_patterns:
-            match = re.search(pattern, query, re.IGNORECASE)
+        for pattern, days in DURATION_PATTERNS:
+            match = pattern.search(query)
             if match:
-                number = int(match.group(1))
-                if 'día' in pattern:
-                    duration_info['duration_days'] = number
-                elif 'semana' in pattern:
-                    duration_info['duration_days'] = number * 7
-                elif 'mes' in pattern:
-                    duration_info['duration_days'] = number * 30
+                duration_info['duration_days'] = int(match.group(1)) * days
 
         return duration_info
 
-    def _extract_special_requirements(self, query: str) -> Dict[str, bool]:
+    def _extract_special_requirements(self, query: str, keyword_match: KeywordMatch = None) -> Dict[str, bool]:
         """
         Extrae requerimientos especiales mencionados en la consulta
         """
-        requirements = {
-            'gps': False,
-            'child_seat': False,
-            'additional_driver': False,
-            'insurance': False,
-            'automatic': False
-        }
-
-        requirement_keywords = {
-            'gps': ['gps', 'navegador', 'navegación'],
-            'child_seat': ['silla', 'asiento', 'niño', 'bebé'],
-            'additional_driver': ['conductor adicional', 'segundo conductor'],
-            'insurance': ['seguro', 'cobertura'],
-            'automatic': ['automático', 'automática']
+        keyword_match = keyword_match or self.match_keywords(query)
+        return {
+            requirement: keyword_match.has('requirement', requirement)
+            for requirement in self.requirement_keywords
         }
 
-        query = query.lower()
-        for req, keywords in requirement_keywords.items():
-            if any(keyword in query for keyword in keywords):
-                requirements[req] = True
-
-        return requirements
-
-    def _is_weekend(self) -> bool:
+    def _is_weekend(self, current_date: datetime = None) -> bool:
         """
         Determina si la fecha actual es fin de semana
         """
-        return datetime.now().weekday() >= 5
+        return (current_date or datetime.now()).weekday() >= 5
 
     def _is_date_in_range(self, current_month, current_day,
                          start_month, start_day, end_month, end_day) -> bool:
@@ -227,4 +295,15 @@ class ContextBuilder:
         if start <= end:
             return start <= current <= end
         else:  # Para rangos que cruzan el año
-            return current >= start or current <= end
\ No newline at end of file
+            return current >= start or current <= end
+
+
+# Constructor por proceso del pool, creado en el primer lote que recibe
+_worker_builder = None
+
+
+def _build_context_batch(batch, time_context: Dict[str, Any]):
+    global _worker_builder
+    if _worker_builder is None:
+        _worker_builder = ContextBuilder()
+    return list(_worker_builder._build_batch(batch, time_context))
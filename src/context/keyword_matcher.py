@@ -0,0 +1,56 @@
+import re
+from typing import Any, Dict, Hashable, List, Set
+
+
+class KeywordMatch:
+    """Resultado de una búsqueda: etiquetas encontradas por tabla"""
+
+    def __init__(self, tables: Dict[str, Dict[Any, List[str]]], hits: Dict[str, Set[Any]]):
+        self._tables = tables
+        self.hits = hits
+
+    def has(self, table: str, label: Any) -> bool:
+        return label in self.hits.get(table, ())
+
+    def first(self, table: str, default: Any = None) -> Any:
+        """Primera etiqueta encontrada respetando el orden de prioridad de la tabla"""
+        found = self.hits.get(table)
+        if found:
+            for label in self._tables[table]:
+                if label in found:
+                    return label
+        return default
+
+
+class KeywordMatcher:
+    """
+    Compila varias tablas de palabras clave en una sola expresión regular y
+    encuentra todas las coincidencias (como subcadenas) en una pasada
+    """
+
+    def __init__(self, tables: Dict[str, Dict[Hashable, List[str]]]):
+        self.tables = tables
+        self._labels = {}  # palabra clave -> [(tabla, etiqueta)]
+        for table, entries in tables.items():
+            for label, keywords in entries.items():
+                for keyword in keywords:
+                    self._labels.setdefault(keyword.lower(), []).append((table, label))
+
+        # Alternativas de mayor a menor longitud: en cada posición gana la más larga
+        keywords = sorted(self._labels, key=len, reverse=True)
+        self._pattern = re.compile('(?=(' + '|'.join(re.escape(keyword) for keyword in keywords) + '))')
+
+        # Las palabras clave más cortas que empiezan en la misma posición son prefijos de la más larga
+        self._implied = {
+            keyword: [other for other in keywords if keyword.startswith(other)]
+            for keyword in keywords
+        }
+
+    def match(self, text: str) -> KeywordMatch:
+        hits = {table: set() for table in self.tables}
+        found = {m.group(1) for m in self._pattern.finditer((text or "").lower())}
+        for keyword in found:
+            for implied in self._implied[keyword]:
+                for table, label in self._labels[implied]:
+                    hits[table].add(label)
+        return KeywordMatch(self.tables, hits)
@@ -0,0 +1,279 @@
+import glob
+import json
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+
+from src.config import Config
+from src.database.models import Interaction
+
+# Columnas JSON que se aplanan en columnas tipadas con su nombre como prefijo
+JSON_COLUMNS = ('context', 'success_indicators')
+BASE_COLUMNS = tuple(column.name for column in Interaction.__table__.columns)
+_BASE_TYPES = {
+    column.name: column.type.python_type
+    for column in Interaction.__table__.columns if column.name not in JSON_COLUMNS
+}
+
+_PARTITION = re.compile(r'interactions_(\d{4})-(\d{2})\.parquet$')
+
+
+def month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(value: datetime) -> datetime:
+    return (month_start(value) + timedelta(days=32)).replace(day=1)
+
+
+def flatten_interactions(rows: Iterable[Dict[str, Any]]):
+    """
+    DataFrame con las interacciones y sus columnas JSON aplanadas:
+    context['location_info']['pickup_location'] pasa a la columna
+    context_location_info_pickup_location, con tipo propio
+    """
+    import pandas as pd
+
+    rows = list(rows)
+    frame = pd.DataFrame.from_records(
+        [{key: value for key, value in row.items() if key not in JSON_COLUMNS} for row in rows]
+    )
+    for column in JSON_COLUMNS:
+        values = [row.get(column) for row in rows]
+        if not any(isinstance(value, dict) for value in values):
+            continue
+        flat = pd.json_normalize([value if isinstance(value, dict) else {} for value in values], sep='_')
+        frame = pd.concat([frame, flat.add_prefix(f"{column}_")], axis=1)
+    return _typed(frame)
+
+
+def _typed(frame):
+    """
+    Tipos estables entre meses: las columnas de la tabla toman el tipo del
+    modelo y las aplanadas un tipo nullable (los números siempre como Float64);
+    lo que no tiene tipo escalar se guarda como JSON
+    """
+    for column in frame.columns:
+        if column in _BASE_TYPES:
+            frame[column] = _cast(frame[column], _BASE_TYPES[column])
+        elif column == 'context_timestamp':
+            frame[column] = _cast(frame[column], datetime)
+        else:
+            frame[column] = frame[column].convert_dtypes(convert_integer=False)
+            if frame[column].dtype == object:
+                frame[column] = frame[column].map(
+                    lambda value: value if value is None or isinstance(value, str)
+                    else json.dumps(value, default=str, ensure_ascii=False)
+                ).astype('string')
+    return frame
+
+
+def _cast(series, python_type: type):
+    import pandas as pd
+
+    if python_type is datetime:
+        return pd.to_datetime(series, errors='coerce').astype('datetime64[us]')
+    try:
+        return series.astype({int: 'Int64', float: 'Float64'}.get(python_type, 'string'))
+    except (TypeError, ValueError):
+        # Valores que no encajan con el tipo declarado (p. ej. nombres de categoría en category_id)
+        return series.astype('string')
+
+
+class InteractionArchive:
+    """
+    Retención de la tabla de interacciones: la tabla principal sólo conserva
+    la ventana caliente y los meses anteriores se compactan en ficheros
+    Parquet mensuales (interactions_AAAA-MM.parquet)
+    """
+
+    def __init__(self, directory: str = None, hot_days: int = None, batch_size: int = 5000):
+        self.directory = directory or Config.ARCHIVE_PATH
+        self.hot_days = hot_days if hot_days is not None else Config.ARCHIVE_HOT_DAYS
+        self.batch_size = batch_size
+
+    def cutoff(self, now: datetime = None) -> datetime:
+        """
+        Inicio del mes que contiene el límite de la ventana caliente: sólo se
+        archivan meses completos, así cada fichero se escribe una vez
+        """
+        return month_start((now or datetime.utcnow()) - timedelta(days=self.hot_days))
+
+    def partition_path(self, month: datetime) -> str:
+        return os.path.join(self.directory, f"interactions_{month:%Y-%m}.parquet")
+
+    def partitions(self, since: datetime = None, until: datetime = None) -> List[Tuple[datetime, str]]:
+        """(mes, ruta) de los ficheros archivados que se solapan con [since, until)"""
+        found = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "interactions_*.parquet"))):
+            match = _PARTITION.search(path)
+            if not match:
+                continue
+            month = datetime(int(match.group(1)), int(match.group(2)), 1)
+            if since is not None and next_month(month) <= since:
+                continue
+            if until is not None and month >= until:
+                continue
+            found.append((month, path))
+        return found
+
+    def archive(self, session: Session, now: datetime = None, vacuum: bool = False) -> Dict[str, int]:
+        """
+        Mueve a Parquet las interacciones anteriores a la ventana caliente. Cada
+        mes se escribe (de forma atómica) antes de borrar sus filas de la tabla
+        """
+        stats = {'months': 0, 'archived': 0}
+        cutoff = self.cutoff(now)
+        oldest = session.scalar(select(func.min(Interaction.timestamp)).where(Interaction.timestamp < cutoff))
+        if oldest is None:
+            return stats
+
+        os.makedirs(self.directory, exist_ok=True)
+        month = month_start(oldest)
+        while month < cutoff:
+            end = next_month(month)
+            archived = self._archive_month(session, month, end)
+            if archived:
+                stats['months'] += 1
+                stats['archived'] += archived
+            month = end
+
+        if vacuum and stats['archived'] and session.get_bind().dialect.name == 'sqlite':
+            # VACUUM no puede ejecutarse dentro de una transacción
+            with session.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                connection.execute(text("VACUUM"))
+        return stats
+
+    def _archive_month(self, session: Session, start: datetime, end: datetime) -> int:
+        import pandas as pd
+
+        rows = session.execute(
+            select(Interaction.__table__)
+            .where(Interaction.timestamp >= start, Interaction.timestamp < end)
+            .order_by(Interaction.id)
+            .execution_options(yield_per=self.batch_size)
+        ).mappings()
+        frames = [flatten_interactions(batch) for batch in self._batches(rows)]
+        if not frames:
+            return 0
+
+        frame = pd.concat(frames, ignore_index=True)
+        ids = frame['id'].astype('int64').tolist()
+        path = self.partition_path(start)
+        if os.path.exists(path):
+            # Reintento tras un fallo entre la escritura y el borrado, o filas con fecha atrasada
+            frame = pd.concat([pd.read_parquet(path), frame], ignore_index=True) \
+                .drop_duplicates('id', keep='last').sort_values('id', ignore_index=True)
+        self._write(_typed(frame), path)
+
+        try:
+            for chunk_start in range(0, len(ids), 500):
+                session.execute(delete(Interaction).where(Interaction.id.in_(ids[chunk_start:chunk_start + 500])))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        return len(ids)
+
+    def _batches(self, rows) -> Iterator[List[Dict[str, Any]]]:
+        batch = []
+        for row in rows:
+            batch.append(dict(row))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _write(frame, path: str):
+        temp_path = f"{path}.tmp"
+        frame.to_parquet(temp_path, engine='pyarrow', compression='zstd', index=False)
+        os.replace(temp_path, path)
+
+    def read(self, since: datetime = None, until: datetime = None, columns: List[str] = None,
+             min_feedback: float = None):
+        """Interacciones archivadas en [since, until); sólo se leen los meses y columnas necesarios"""
+        import pandas as pd
+
+        filters = []
+        if since is not None:
+            filters.append(('timestamp', '>=', pd.Timestamp(since)))
+        if until is not None:
+            filters.append(('timestamp', '<', pd.Timestamp(until)))
+        if min_feedback is not None:
+            filters.append(('feedback_score', '>=', min_feedback))
+
+        frames = []
+        for _, path in self.partitions(since, until):
+            read_columns = None
+            if columns is not None:
+                import pyarrow.parquet as pq
+
+                available = set(pq.read_schema(path).names)
+                read_columns = [column for column in columns if column in available]
+            frames.append(pd.read_parquet(path, engine='pyarrow', columns=read_columns, filters=filters or None))
+        if not frames:
+            return pd.DataFrame(columns=columns or [])
+        return pd.concat(frames, ignore_index=True)
+
+    def query(self, session: Session, since: datetime = None, until: datetime = None,
+              columns: List[str] = None, min_feedback: float = None):
+        """
+        Interacciones de la tabla caliente y del archivo como un único DataFrame
+        con las columnas JSON aplanadas. Con `columns` (nombres ya aplanados)
+        sólo se leen de la tabla las columnas base necesarias
+        """
+        import pandas as pd
+
+        if columns is not None:
+            columns = list(dict.fromkeys(['id', 'timestamp', *columns]))
+            wanted = {column for column in columns if column in BASE_COLUMNS}
+            wanted.update(name for name in JSON_COLUMNS
+                          if any(column.startswith(f"{name}_") for column in columns))
+            selected = [column for column in Interaction.__table__.columns if column.name in wanted]
+        else:
+            selected = list(Interaction.__table__.columns)
+
+        statement = select(*selected)
+        if since is not None:
+            statement = statement.where(Interaction.timestamp >= since)
+        if until is not None:
+            statement = statement.where(Interaction.timestamp < until)
+        if min_feedback is not None:
+            statement = statement.where(Interaction.feedback_score >= min_feedback)
+        hot = flatten_interactions(dict(row) for row in session.execute(statement).mappings())
+
+        archived = self.read(since, until, columns, min_feedback)
+        frames = [frame for frame in (archived, hot) if len(frame)]
+        if not frames:
+            return pd.DataFrame(columns=columns or list(BASE_COLUMNS))
+        # Si un archivado se interrumpió antes del borrado, prevalece la fila de la tabla
+        frame = pd.concat(frames, ignore_index=True).drop_duplicates('id', keep='last')
+        frame = frame.sort_values('timestamp', ignore_index=True)
+        if columns is not None:
+            frame = frame.reindex(columns=columns)
+        return frame
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.database.crud import get_engine, get_session_factory, init_db
+
+    parser = argparse.ArgumentParser(description="Archiva en Parquet las interacciones fuera de la ventana caliente")
+    parser.add_argument('--hot-days', type=int)
+    parser.add_argument('--directory')
+    parser.add_argument('--vacuum', action='store_true', help="Compacta la base de datos SQLite tras archivar")
+    args = parser.parse_args()
+
+    init_db(get_engine())
+    session = get_session_factory()()
+    try:
+        print(InteractionArchive(args.directory, args.hot_days).archive(session, vacuum=args.vacuum))
+    finally:
+        session.close()
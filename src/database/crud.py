@@ -0,0 +1,150 @@
+from functools import lru_cache
+
+from sqlalchemy import case, create_engine, event, func, insert, inspect, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.config import Config
+from src.database.models import Base, IdBlock, ResponseTemplate
+
+
+def create_db_engine(database_url: str = None, pool_size: int = None, max_overflow: int = None,
+                     echo: bool = False) -> Engine:
+    """
+    Crea el engine con pool de conexiones. En SQLite activa WAL (lecturas
+    concurrentes con un escritor), synchronous=NORMAL y lectura por mmap
+    """
+    database_url = database_url or Config.DATABASE_URL
+    if not database_url.startswith("sqlite"):
+        return create_engine(
+            database_url,
+            pool_size=pool_size or Config.DB_POOL_SIZE,
+            max_overflow=max_overflow if max_overflow is not None else Config.DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+            echo=echo
+        )
+
+    # Las conexiones se comparten entre los hilos del pool
+    connect_args = {"check_same_thread": False, "timeout": Config.SQLITE_BUSY_TIMEOUT}
+    in_memory = database_url in ("sqlite://", "sqlite:///:memory:")
+    if in_memory:
+        # Una base en memoria sólo existe dentro de su conexión
+        engine = create_engine(database_url, connect_args=connect_args, poolclass=StaticPool, echo=echo)
+    else:
+        engine = create_engine(
+            database_url,
+            connect_args=connect_args,
+            pool_size=pool_size or Config.DB_POOL_SIZE,
+            max_overflow=max_overflow if max_overflow is not None else Config.DB_MAX_OVERFLOW,
+            echo=echo
+        )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={int(Config.SQLITE_MMAP_SIZE)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    return engine
+
+
+def create_session_factory(engine: Engine) -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    """Engine compartido del proceso, configurado con Config.DATABASE_URL"""
+    return create_db_engine()
+
+
+@lru_cache(maxsize=None)
+def get_session_factory() -> sessionmaker:
+    return create_session_factory(get_engine())
+
+
+def init_db(engine: Engine):
+    """Crea las tablas que falten, añade las columnas nuevas y los índices de las consultas calientes"""
+    Base.metadata.create_all(engine)
+    ensure_columns(engine)
+    ensure_indexes(engine)
+
+
+def ensure_columns(engine: Engine):
+    """
+    create_all tampoco altera tablas existentes: añade las columnas declaradas
+    en los modelos que falten en bases de datos anteriores. Los acumuladores de
+    plantilla se rellenan a partir de las antiguas columnas de promedios
+    """
+    inspector = inspect(engine)
+    added = {}
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+                added.setdefault(table.name, set()).add(column.name)
+
+        template_columns = added.get(ResponseTemplate.__tablename__, set())
+        legacy_columns = {column['name'] for column in inspector.get_columns(ResponseTemplate.__tablename__)}
+        if 'feedback_sum' in template_columns and 'average_feedback' in legacy_columns:
+            connection.execute(text(
+                "UPDATE response_templates "
+                "SET feedback_sum = COALESCE(average_feedback, 0) * COALESCE(use_count, 0)"
+            ))
+        if 'success_count' in template_columns and 'success_rate' in legacy_columns:
+            connection.execute(text(
+                "UPDATE response_templates "
+                "SET success_count = CAST(ROUND(COALESCE(success_rate, 0) * COALESCE(use_count, 0)) AS INTEGER)"
+            ))
+    return added
+
+
+def ensure_indexes(engine: Engine):
+    """
+    create_all no añade índices a tablas ya existentes: crea los que falten en
+    bases de datos anteriores a su declaración en los modelos
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
+def reserve_ids(session: Session, model, count: int = 1) -> int:
+    """
+    Reserva `count` IDs consecutivos de la tabla de `model` y devuelve el
+    primero. La reserva es un UPDATE atómico sobre id_blocks, así que varios
+    procesos escritores nunca reciben el mismo ID; nunca baja del máximo ya
+    presente en la tabla. Se confirma con la transacción de `session`
+    """
+    name = model.__tablename__
+    floor = select(func.coalesce(func.max(model.id), 0) + 1).scalar_subquery()
+    for _ in range(2):
+        reserved = session.execute(
+            update(IdBlock).where(IdBlock.name == name)
+            .values(next_id=case((IdBlock.next_id > floor, IdBlock.next_id), else_=floor) + count)
+        )
+        if reserved.rowcount:
+            return session.scalar(select(IdBlock.next_id).where(IdBlock.name == name)) - count
+        try:
+            with session.begin_nested():
+                session.execute(insert(IdBlock).values(name=name, next_id=floor))
+        except IntegrityError:
+            # Otro proceso ha creado la fila a la vez: basta con repetir el UPDATE
+            pass
+    raise RuntimeError(f"No se pudieron reservar IDs para {name}")
+
+
+if __name__ == "__main__":
+    # Paso de migración: crea las tablas y añade las columnas e índices que falten
+    init_db(get_engine())
+    print(f"Esquema actualizado en {Config.DATABASE_URL}")
@@ -0,0 +1,160 @@
+import atexit
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from src.database.crud import reserve_ids
+from src.database.models import Interaction
+
+
+class InteractionWriter:
+    """
+    Registro diferido de interacciones: asigna el ID al momento, encola la fila
+    y la vuelca con inserciones masivas por tamaño o por tiempo.
+
+    Los IDs salen de bloques reservados en la tabla id_blocks (ver
+    crud.reserve_ids), así que varios procesos pueden escribir a la vez.
+    """
+
+    def __init__(self, session_factory: sessionmaker, batch_size: int = 200, flush_interval: float = 1.0,
+                 id_block_size: int = 1000):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.id_block_size = id_block_size
+
+        self._pending = {}  # id -> fila aún no volcada
+        self._in_flight = set()  # ids que se están insertando
+        self._next_id = 0
+        self._block_end = 0  # Primer ID fuera del bloque reservado
+        self._lock = threading.Lock()
+        self._reserve_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self.flushed = 0
+        self.flushes = 0
+        self.rejected = 0  # Filas descartadas por violar una restricción
+
+        self._worker = threading.Thread(target=self._run, name="interaction-writer", daemon=True)
+        self._worker.start()
+        atexit.register(self.close)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, **fields) -> Interaction:
+        """Encola una interacción y devuelve un objeto transitorio con su ID ya asignado"""
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("El InteractionWriter está cerrado")
+                if self._next_id < self._block_end:
+                    fields['id'] = self._next_id
+                    self._next_id += 1
+                    self._pending[fields['id']] = dict(fields)
+                    pending = len(self._pending)
+                    break
+            # Bloque agotado: la reserva va a la base de datos, fuera de _lock
+            self._reserve_block()
+
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return Interaction(**fields)
+
+    def _reserve_block(self):
+        with self._reserve_lock:
+            with self._lock:
+                if self._next_id < self._block_end:
+                    return
+            with self.session_factory() as session:
+                start = reserve_ids(session, Interaction, self.id_block_size)
+                session.commit()
+            with self._lock:
+                self._next_id, self._block_end = start, start + self.id_block_size
+
+    def update_pending(self, interaction_id: int, updater: Callable[[Dict[str, Any]], Any]) -> Optional[Any]:
+        """
+        Aplica `updater` a la fila en memoria si aún no se ha volcado y devuelve
+        su resultado; None si la fila ya está en la base de datos
+        """
+        while True:
+            with self._lock:
+                row = self._pending.get(interaction_id)
+                if row is None:
+                    return None
+                if interaction_id not in self._in_flight:
+                    return updater(row)
+            # Esperar al volcado en curso: si falla, la fila vuelve a estar pendiente
+            with self._flush_lock:
+                pass
+
+    def flush(self):
+        """Inserta en bloque todas las filas pendientes"""
+        with self._flush_lock:
+            with self._lock:
+                rows = [row for interaction_id, row in self._pending.items()
+                        if interaction_id not in self._in_flight]
+                self._in_flight.update(row['id'] for row in rows)
+            if not rows:
+                return
+
+            try:
+                inserted, rejected = self._insert(rows)
+            except Exception as e:
+                # Error transitorio (base de datos no disponible...): las filas se conservan para reintentar
+                print(f"Error flushing interactions: {str(e)}")
+                with self._lock:
+                    self._in_flight.difference_update(row['id'] for row in rows)
+                return
+
+            with self._lock:
+                for row in rows:
+                    self._pending.pop(row['id'], None)
+                self._in_flight.difference_update(row['id'] for row in rows)
+                self.flushed += inserted
+                self.flushes += 1
+                self.rejected += len(rejected)
+            if rejected:
+                print(f"Error flushing interactions: {len(rejected)} rows rejected "
+                      f"(ids {', '.join(str(row['id']) for row in rejected[:10])})")
+
+    def _insert(self, rows) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Inserta las filas en una transacción; si alguna viola una restricción,
+        divide el lote para insertar las demás. Devuelve (insertadas, rechazadas)
+        """
+        try:
+            with self.session_factory() as session:
+                session.execute(insert(Interaction), rows)
+                session.commit()
+            return len(rows), []
+        except IntegrityError:
+            if len(rows) == 1:
+                return 0, rows
+        middle = len(rows) // 2
+        first_inserted, first_rejected = self._insert(rows[:middle])
+        second_inserted, second_rejected = self._insert(rows[middle:])
+        return first_inserted + second_inserted, first_rejected + second_rejected
+
+    def close(self):
+        """Detiene el volcado periódico y escribe lo pendiente; falla si no se ha podido escribir todo"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wakeup.set()
+        self._worker.join()
+        self.flush()
+        if self._pending:
+            raise RuntimeError(f"No se pudieron volcar {len(self._pending)} interacciones pendientes")
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._pending:
+                self.flush()
@@ -1,5 +1,6 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON, ForeignKey, Index, case
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -22,27 +23,84 @@ class ResponseTemplate(Base):
     category_id = Column(Integer, ForeignKey('query_categories.id'))
     template = Column(String)
     context_pattern = Column(String)  # Patrón de contexto donde esta respuesta funciona mejor
-    success_rate = Column(Float, default=0.0)
+    # Acumuladores que se incrementan de forma atómica; los promedios se derivan al leer
     use_count = Column(Integer, default=0)
-    average_feedback = Column(Float, default=0.0)
-    last_updated = Column(DateTime, default=datetime.utcnow)
+    feedback_sum = Column(Float, default=0.0)
+    success_count = Column(Integer, default=0)
+    last_updated = Column(DateTime, default=datetime.utcnow)  # Último cambio del texto: invalida la plantilla compilada
 
     category = relationship("QueryCategory")
 
+    @hybrid_property
+    def average_feedback(self):
+        return (self.feedback_sum or 0.0) / self.use_count if self.use_count else 0.0
+
+    @average_feedback.expression
+    def average_feedback(cls):
+        return case((cls.use_count > 0, cls.feedback_sum / cls.use_count), else_=0.0)
+
+    @hybrid_property
+    def success_rate(self):
+        return (self.success_count or 0) / self.use_count if self.use_count else 0.0
+
+    @success_rate.expression
+    def success_rate(cls):
+        return case((cls.use_count > 0, cls.success_count * 1.0 / cls.use_count), else_=0.0)
+
 
 class Interaction(Base):
     __tablename__ = 'interactions'
+    __table_args__ = (
+        # Ventana del optimizador: feedback mínimo dentro de un rango de fechas
+        Index('ix_interactions_feedback_score_timestamp', 'feedback_score', 'timestamp'),
+    )
 
     id = Column(Integer, primary_key=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)  # Rango del archivado mensual
     query = Column(String)
     response = Column(String)
-    category_id = Column(Integer, ForeignKey('query_categories.id'))
-    template_id = Column(Integer, ForeignKey('response_templates.id'))
+    category_id = Column(Integer, ForeignKey('query_categories.id'), index=True)
+    template_id = Column(Integer, ForeignKey('response_templates.id'), index=True)
     context = Column(JSON)  # Almacena el contexto de la consulta
     feedback_score = Column(Float)
     feedback_comments = Column(String)
+    feedback_timestamp = Column(DateTime, index=True)  # Momento en que se registró el feedback
     success_indicators = Column(JSON)  # Métricas de éxito específicas
+    time_to_first_token = Column(Float)  # Segundos hasta el primer fragmento (modo streaming)
+    generation_time = Column(Float)  # Segundos hasta completar la respuesta (modo streaming)
 
     category = relationship("QueryCategory")
-    template = relationship("ResponseTemplate")
\ No newline at end of file
+    template = relationship("ResponseTemplate")
+
+class DocumentChunk(Base):
+    __tablename__ = 'document_chunks'
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String, index=True)  # Ruta del documento relativa al directorio de ingesta
+    chunk_index = Column(Integer)
+    text = Column(String)
+    content_hash = Column(String)  # Hash del documento del que procede el fragmento
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class VehicleImage(Base):
+    __tablename__ = 'vehicle_images'
+
+    id = Column(Integer, primary_key=True)
+    source = Column(String, unique=True)  # Ruta del fichero precedida del nombre de su directorio de ingesta
+    content_hash = Column(String, index=True)  # SHA-256 del fichero original
+    width = Column(Integer)
+    height = Column(Integer)
+    phash = Column(String)  # Hashes perceptuales de 64 bits en hexadecimal
+    dhash = Column(String)
+    thumbnail_path = Column(String)
+    duplicate_of = Column(Integer, ForeignKey('vehicle_images.id'), index=True)  # Imagen canónica si es casi idéntica
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class IdBlock(Base):
+    """Siguiente ID libre por tabla: los escritores reservan bloques aquí y no pueden repetir IDs"""
+    __tablename__ = 'id_blocks'
+
+    name = Column(String, primary_key=True)  # Nombre de la tabla
+    next_id = Column(Integer, nullable=False)
@@ -0,0 +1,131 @@
+import numpy as np
+
+
+class RandomProjectionLSH:
+    """Índice aproximado (LSH por proyecciones aleatorias) sobre vectores TF-IDF
+
+    Cada tabla asigna a cada fila una firma de `n_bits` bits según el signo de
+    sus proyecciones aleatorias; las filas con la misma firma que la consulta
+    (o a distancia de Hamming `probe_radius`) son los candidatos. Más tablas o
+    mayor radio aumentan el recall a costa de latencia; más bits lo reducen.
+
+    Con los valores por defecto (8 tablas, 14 bits, radio 1, ann_top_k=300)
+    benchmarks/ann_benchmark.py da un recall@1 de 0.68 con 10k filas, 0.82
+    con 100k y 0.94 con 1M: cada consulta revisa ~3 % de la ventana, y el
+    recall sólo es alto en ventanas grandes. Con 100k filas, 12 bits dan 0.93
+    y 10 bits 0.96, pero revisan el 6 % y el 16 % de las filas. Por debajo
+    de ~100k filas el modo exacto es igual de rápido y no pierde recall.
+    """
+
+    def __init__(self, n_tables: int = 8, n_bits: int = 14, probe_radius: int = 1,
+                 rebuild_ratio: float = 0.1, seed: int = 0, chunk_size: int = 50_000):
+        if not 1 <= n_bits <= 32:
+            raise ValueError("n_bits debe estar entre 1 y 32")
+        if probe_radius not in (0, 1):
+            raise ValueError("probe_radius debe ser 0 o 1")
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.probe_radius = probe_radius
+        # Proporción de filas sin ordenar que dispara la reconstrucción de las tablas
+        self.rebuild_ratio = rebuild_ratio
+        self.seed = seed
+        self.chunk_size = chunk_size
+
+        self.projections = None
+        self.signatures = np.empty((0, n_tables), dtype=np.uint32)
+        self._sorted_keys = []
+        self._sorted_rows = []
+        self._n_sorted = 0
+        self._weights = (1 << np.arange(n_bits, dtype=np.uint64)).astype(np.uint32)
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def fit(self, matrix):
+        """Genera las proyecciones para el vocabulario actual y firma todas las filas"""
+        self.signatures = np.empty((0, self.n_tables), dtype=np.uint32)
+        if matrix is None:
+            self.projections = None
+            self._build_tables()
+            return
+
+        rng = np.random.default_rng(self.seed)
+        self.projections = rng.standard_normal(
+            (matrix.shape[1], self.n_tables * self.n_bits)
+        ).astype(np.float32)
+        self.signatures = self._sign(matrix)
+        self._build_tables()
+
+    def append(self, matrix_rows):
+        """Firma filas nuevas; se consultan por barrido hasta la próxima reconstrucción"""
+        if self.projections is None or matrix_rows.shape[0] == 0:
+            return
+        self.signatures = np.concatenate([self.signatures, self._sign(matrix_rows)])
+        if len(self.signatures) - self._n_sorted > self.rebuild_ratio * max(self._n_sorted, 1):
+            self._build_tables()
+
+    def take(self, rows):
+        """Conserva únicamente las filas indicadas, renumerando las tablas sin reordenar"""
+        rows = np.asarray(rows)
+        keep = np.zeros(len(self.signatures), dtype=bool)
+        keep[rows] = True
+        new_positions = np.cumsum(keep) - 1
+
+        for table in range(self.n_tables):
+            sorted_rows = self._sorted_rows[table]
+            kept = keep[sorted_rows]
+            self._sorted_keys[table] = self._sorted_keys[table][kept]
+            self._sorted_rows[table] = new_positions[sorted_rows[kept]].astype(np.int32)
+
+        self._n_sorted = int(keep[:self._n_sorted].sum())
+        self.signatures = self.signatures[keep]
+
+    def query(self, vector) -> np.ndarray:
+        """Devuelve las posiciones candidatas para un vector de consulta (1 x n_features)"""
+        if self.projections is None or not len(self.signatures):
+            return np.empty(0, dtype=np.int64)
+
+        query_keys = self._sign(vector)[0]
+        candidates = []
+        for table in range(self.n_tables):
+            probe_keys = self._probe_keys(query_keys[table])
+            keys = self._sorted_keys[table]
+            starts = np.searchsorted(keys, probe_keys, side='left')
+            ends = np.searchsorted(keys, probe_keys, side='right')
+            for start, end in zip(starts, ends):
+                if end > start:
+                    candidates.append(self._sorted_rows[table][start:end])
+
+            # Filas añadidas desde la última reconstrucción
+            tail = self.signatures[self._n_sorted:, table]
+            if len(tail):
+                hits = np.flatnonzero(np.isin(tail, probe_keys))
+                candidates.append(hits + self._n_sorted)
+
+        if not candidates:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(candidates)).astype(np.int64)
+
+    def _probe_keys(self, key) -> np.ndarray:
+        if self.probe_radius == 0:
+            return np.array([key], dtype=np.uint32)
+        # La firma exacta más todas las que difieren en un bit
+        return np.sort(np.concatenate([[key], key ^ self._weights]).astype(np.uint32))
+
+    def _sign(self, matrix) -> np.ndarray:
+        signatures = np.empty((matrix.shape[0], self.n_tables), dtype=np.uint32)
+        for start in range(0, matrix.shape[0], self.chunk_size):
+            chunk = matrix[start:start + self.chunk_size]
+            bits = np.asarray(chunk @ self.projections) > 0
+            bits = bits.reshape(-1, self.n_tables, self.n_bits)
+            signatures[start:start + len(bits)] = (bits * self._weights).sum(axis=2, dtype=np.uint64)
+        return signatures
+
+    def _build_tables(self):
+        self._sorted_keys = []
+        self._sorted_rows = []
+        for table in range(self.n_tables):
+            order = np.argsort(self.signatures[:, table], kind='stable').astype(np.int32)
+            self._sorted_rows.append(order)
+            self._sorted_keys.append(self.signatures[order, table])
+        self._n_sorted = len(self.signatures)
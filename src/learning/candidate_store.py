@@ -0,0 +1,241 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from src.database.models import Interaction
+from src.learning.ann_index import RandomProjectionLSH
+from src.learning.context_encoder import ContextEncoder, ContextMatrix
+from src.learning.query_index import QueryIndex
+
+# Sin plantilla asociada
+NO_TEMPLATE = -1
+
+
+class CandidateStore:
+    """Ventana deslizante en memoria con las interacciones exitosas recientes"""
+
+    # Columnas necesarias para puntuar; la respuesta completa nunca se carga
+    COLUMNS = (
+        Interaction.id,
+        Interaction.timestamp,
+        Interaction.query,
+        Interaction.template_id,
+        Interaction.context,
+        Interaction.feedback_score,
+        Interaction.feedback_timestamp
+    )
+
+    def __init__(self, encoder: ContextEncoder = None, min_feedback: float = 4.0,
+                 window_days: int = 30, max_rows: int = 200_000,
+                 refresh_interval: float = 30.0, full_reload_interval: float = 3600.0,
+                 ann: RandomProjectionLSH = None, background_reload: bool = True):
+        self.encoder = encoder or ContextEncoder()
+        self.min_feedback = min_feedback
+        self.window_days = window_days
+        self.max_rows = max_rows
+        # Segundos entre consultas incrementales y entre recargas completas
+        self.refresh_interval = refresh_interval
+        self.full_reload_interval = full_reload_interval
+        # Las recargas completas posteriores a la primera se construyen en otro hilo
+        self.background_reload = background_reload
+
+        self.index = QueryIndex()
+        # Índice aproximado opcional, alineado con las filas del índice TF-IDF
+        self.ann = ann
+        self._ann_version = None
+        self.contexts = ContextMatrix()
+        self.ids = np.empty(0, dtype=np.int64)
+        self.template_ids = np.empty(0, dtype=np.int64)
+        self.timestamps = np.empty(0, dtype='datetime64[us]')
+
+        self.watermark = None  # Último feedback_timestamp observado
+        self._last_refresh = None
+        self._last_full_load = None
+        self._reload_thread = None
+        self._reloaded = None  # Ventana reconstruida pendiente de adoptar
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._last_full_load is not None
+
+    def window_start(self) -> datetime:
+        return datetime.utcnow() - timedelta(days=self.window_days)
+
+    def refresh(self, session, force: bool = False):
+        """
+        Sincroniza la ventana con la base de datos si ha vencido el intervalo.
+        La recarga completa periódica se construye en segundo plano y se adopta
+        en un refresco posterior; mientras tanto se sigue con la incremental
+        """
+        now = time.monotonic()
+        if not force and self._last_refresh is not None \
+                and now - self._last_refresh < self.refresh_interval:
+            return
+
+        if self._reloaded is not None:
+            # La consulta incremental de abajo recupera el feedback llegado durante la reconstrucción
+            self._adopt(self._reloaded)
+        reload_due = self._last_full_load is not None \
+            and now - self._last_full_load >= self.full_reload_interval
+
+        if self._last_full_load is None or (reload_due and not self.background_reload):
+            self.load(session)
+        else:
+            if reload_due:
+                self._start_reload(session)
+            self._load_since_watermark(session)
+            self.expire()
+        self._last_refresh = now
+
+    def load(self, session):
+        """Recarga completa de la ventana"""
+        rows = session.query(*self.COLUMNS) \
+            .filter(Interaction.feedback_score >= self.min_feedback) \
+            .filter(Interaction.timestamp >= self.window_start()) \
+            .order_by(Interaction.timestamp.desc()) \
+            .limit(self.max_rows) \
+            .all()
+        rows.reverse()
+
+        self.contexts = ContextMatrix()
+        self.ids = np.empty(0, dtype=np.int64)
+        self.template_ids = np.empty(0, dtype=np.int64)
+        self.timestamps = np.empty(0, dtype='datetime64[us]')
+        self._append(rows)
+        self.index.fit(self.ids, [row.query for row in rows])
+        self._sync_ann(0)
+
+        self.watermark = max(
+            (row.feedback_timestamp for row in rows if row.feedback_timestamp is not None),
+            default=self.watermark
+        )
+        self._last_full_load = time.monotonic()
+
+    def _start_reload(self, session):
+        if self._reload_thread is not None and self._reload_thread.is_alive():
+            return
+        self._reload_thread = threading.Thread(
+            target=self._reload, args=(session.get_bind(),), name="candidate-reload", daemon=True
+        )
+        self._reload_thread.start()
+
+    def _reload(self, bind):
+        """
+        Construye una ventana nueva con su propia sesión, codificador e índices,
+        sin tocar el estado que están usando las peticiones
+        """
+        reloaded = CandidateStore(
+            min_feedback=self.min_feedback,
+            window_days=self.window_days,
+            max_rows=self.max_rows,
+            refresh_interval=self.refresh_interval,
+            full_reload_interval=self.full_reload_interval,
+            ann=self._empty_ann(),
+            background_reload=False
+        )
+        session = Session(bind=bind)
+        try:
+            reloaded.load(session)
+            self._reloaded = reloaded
+        except Exception as e:
+            print(f"Error al recargar la ventana de candidatos: {str(e)}")
+        finally:
+            session.close()
+
+    def _empty_ann(self):
+        if self.ann is None:
+            return None
+        return RandomProjectionLSH(self.ann.n_tables, self.ann.n_bits, self.ann.probe_radius,
+                                   self.ann.rebuild_ratio, self.ann.seed, self.ann.chunk_size)
+
+    def _adopt(self, reloaded: 'CandidateStore'):
+        """Sustituye la ventana por la reconstruida en segundo plano"""
+        self._reloaded = None
+        self.encoder = reloaded.encoder
+        self.index = reloaded.index
+        self.ann = reloaded.ann
+        self._ann_version = reloaded._ann_version
+        self.contexts = reloaded.contexts
+        self.ids = reloaded.ids
+        self.template_ids = reloaded.template_ids
+        self.timestamps = reloaded.timestamps
+        self.watermark = reloaded.watermark
+        self._last_full_load = reloaded._last_full_load
+
+    def _load_since_watermark(self, session):
+        # Sólo las filas cuyo feedback llegó después de la marca de agua
+        query = session.query(*self.COLUMNS) \
+            .filter(Interaction.timestamp >= self.window_start())
+        if self.watermark is not None:
+            query = query.filter(Interaction.feedback_timestamp >= self.watermark)
+        else:
+            query = query.filter(Interaction.feedback_timestamp.isnot(None))
+        rows = query.order_by(Interaction.feedback_timestamp).all()
+        if not rows:
+            return
+
+        # Un feedback posterior puede haber bajado la puntuación de una fila ya cargada
+        demoted = [row.id for row in rows if row.feedback_score < self.min_feedback]
+        if demoted:
+            self._keep(~np.isin(self.ids, demoted))
+
+        self.add_rows([row for row in rows if row.feedback_score >= self.min_feedback])
+        self.watermark = rows[-1].feedback_timestamp
+
+    def add_rows(self, rows):
+        """Añade filas nuevas a la ventana respetando el límite de memoria"""
+        if not rows:
+            return
+        is_new = ~np.isin(np.array([row.id for row in rows], dtype=np.int64), self.ids)
+        rows = [row for row, new in zip(rows, is_new) if new]
+        if not rows:
+            return
+        self._append(rows)
+        self.index.add([row.id for row in rows], [row.query for row in rows])
+        self._sync_ann(len(rows))
+
+        if len(self.ids) > self.max_rows:
+            # Descartar las filas más antiguas
+            newest = np.argsort(self.timestamps, kind='stable')[-self.max_rows:]
+            self._keep(np.sort(newest))
+
+    def expire(self):
+        """Elimina las filas que han salido de la ventana temporal"""
+        in_window = self.timestamps >= np.datetime64(self.window_start(), 'us')
+        if not in_window.all():
+            self._keep(in_window)
+
+    def _append(self, rows):
+        # Los contextos se codifican una sola vez, al almacenarse
+        self.encoder.encode([row.context for row in rows], self.contexts)
+        self.ids = np.concatenate([self.ids, np.array([row.id for row in rows], dtype=np.int64)])
+        self.template_ids = np.concatenate([self.template_ids, np.array(
+            [row.template_id if row.template_id is not None else NO_TEMPLATE for row in rows],
+            dtype=np.int64)])
+        self.timestamps = np.concatenate([self.timestamps, np.array(
+            [row.timestamp for row in rows], dtype='datetime64[us]')])
+
+    def _keep(self, rows):
+        self.contexts.take(rows)
+        self.ids = self.ids[rows]
+        self.template_ids = self.template_ids[rows]
+        self.timestamps = self.timestamps[rows]
+        self.index.take(rows)
+        if self.ann is not None:
+            self.ann.take(rows)
+
+    def _sync_ann(self, added: int):
+        if self.ann is None:
+            return
+        if self._ann_version != self.index.version:
+            # Vocabulario nuevo: hay que regenerar las proyecciones
+            self.ann.fit(self.index.matrix)
+            self._ann_version = self.index.version
+        elif added:
+            self.ann.append(self.index.matrix[-added:])
@@ -0,0 +1,115 @@
+import json
+
+import numpy as np
+
+# Pesos de cada componente de la similitud de contexto
+VEHICLE_WEIGHT = 0.4
+PRICE_WEIGHT = 0.3
+SEASON_WEIGHT = 0.3
+
+
+class ContextMatrix:
+    """Contextos codificados como columnas numéricas alineadas por fila"""
+
+    def __init__(self):
+        self.vehicle = np.empty(0, dtype=np.int32)
+        self.season = np.empty(0, dtype=np.int32)
+        self.price = np.empty((0, 2), dtype=np.float64)
+
+    def __len__(self):
+        return len(self.vehicle)
+
+    def append(self, vehicle, season, price):
+        self.vehicle = np.concatenate([self.vehicle, np.asarray(vehicle, dtype=np.int32)])
+        self.season = np.concatenate([self.season, np.asarray(season, dtype=np.int32)])
+        self.price = np.concatenate([self.price, np.asarray(price, dtype=np.float64).reshape(-1, 2)])
+
+    def subset(self, rows) -> 'ContextMatrix':
+        """Copia con únicamente las filas indicadas"""
+        subset = ContextMatrix()
+        subset.vehicle = self.vehicle[rows]
+        subset.season = self.season[rows]
+        subset.price = self.price[rows]
+        return subset
+
+    def take(self, rows):
+        """Conserva únicamente las filas indicadas (máscara booleana o índices)"""
+        self.vehicle = self.vehicle[rows]
+        self.season = self.season[rows]
+        self.price = self.price[rows]
+
+
+class ContextEncoder:
+    """Codifica contextos para calcular su similitud contra muchos candidatos a la vez"""
+
+    def __init__(self):
+        # Cada valor categórico distinto recibe un código entero estable
+        self._codes = {None: 0}
+
+    def code(self, value) -> int:
+        """Devuelve el código de un valor, respetando la igualdad de Python"""
+        try:
+            key = value
+            hash(key)
+        except TypeError:
+            # Valores no hashables (listas, dicts) se identifican por su forma JSON
+            key = ('__json__', type(value).__name__, json.dumps(value, sort_keys=True, default=str))
+        if key not in self._codes:
+            self._codes[key] = len(self._codes)
+        return self._codes[key]
+
+    def encode_price(self, price_range):
+        """Convierte un rango de precios en (min, max); NaN si no es un rango válido"""
+        if not (isinstance(price_range, (list, tuple)) and len(price_range) == 2):
+            return np.nan, np.nan
+        try:
+            return float(price_range[0]), float(price_range[1])
+        except (TypeError, ValueError):
+            return np.nan, np.nan
+
+    def encode(self, contexts, matrix: ContextMatrix = None) -> ContextMatrix:
+        """Codifica una secuencia de contextos y los añade a la matriz indicada"""
+        matrix = matrix if matrix is not None else ContextMatrix()
+        contexts = [context or {} for context in contexts]
+        matrix.append(
+            [self.code(context.get('vehicle_type')) for context in contexts],
+            [self.code(context.get('season')) for context in contexts],
+            [self.encode_price(context.get('price_range')) for context in contexts]
+        )
+        return matrix
+
+    def similarity(self, context: dict, matrix: ContextMatrix, rows=None) -> np.ndarray:
+        """Equivalente vectorizado de ResponseOptimizer.calculate_context_similarity"""
+        context = context or {}
+        if rows is not None:
+            matrix = matrix.subset(rows)
+        vehicle = self._lookup(context.get('vehicle_type'))
+        season = self._lookup(context.get('season'))
+        min1, max1 = self.encode_price(context.get('price_range'))
+
+        similarity_score = np.where(matrix.vehicle == vehicle, VEHICLE_WEIGHT, 0.0)
+        similarity_score = similarity_score + self._price_similarity(min1, max1, matrix.price) * PRICE_WEIGHT
+        similarity_score = similarity_score + np.where(matrix.season == season, SEASON_WEIGHT, 0.0)
+
+        total_weights = VEHICLE_WEIGHT + PRICE_WEIGHT + SEASON_WEIGHT
+        return similarity_score / total_weights
+
+    def _lookup(self, value) -> int:
+        # Un valor nunca visto no coincide con ninguna fila almacenada
+        try:
+            hash(value)
+        except TypeError:
+            return self.code(value)
+        return self._codes.get(value, -1)
+
+    @staticmethod
+    def _price_similarity(min1: float, max1: float, prices: np.ndarray) -> np.ndarray:
+        """Equivalente vectorizado de ResponseOptimizer.compare_price_ranges"""
+        min2, max2 = prices[:, 0], prices[:, 1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            overlap = np.maximum(0, np.minimum(max1, max2) - np.maximum(min1, min2))
+            range1 = max1 - min1
+            range2 = max2 - min2
+            valid = (range1 != 0) & (range2 != 0) & ~np.isnan(range1) & ~np.isnan(range2)
+            result = np.where(valid, overlap / np.where(valid, np.minimum(range1, range2), 1), 0.0)
+        return result
@@ -0,0 +1,90 @@
+import numpy as np
+
+
+class QueryIndex:
+    """Índice TF-IDF en memoria sobre las consultas históricas"""
+
+    def __init__(self, refit_ratio: float = 0.5, **vectorizer_params):
+        # Proporción de filas añadidas (respecto al último ajuste) que dispara un reajuste completo
+        self.refit_ratio = refit_ratio
+        self.vectorizer_params = vectorizer_params
+        self.vectorizer = None
+        self.matrix = None  # Matriz dispersa (CSR) con filas normalizadas L2
+        self.keys = np.empty(0, dtype=np.int64)
+        self._texts = []
+        self._fitted_rows = 0
+        self.version = 0  # Aumenta con cada ajuste completo del vocabulario
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.vectorizer is not None
+
+    def fit(self, keys, texts):
+        """Ajusta el vocabulario sobre el corpus completo y reconstruye la matriz"""
+        # Importación diferida: scikit-learn tarda en cargar y sólo hace falta al ajustar
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        texts = [text or "" for text in texts]
+        self.keys = np.asarray(keys, dtype=np.int64)
+        self._texts = list(texts)
+        self.vectorizer = TfidfVectorizer(**self.vectorizer_params)
+        try:
+            self.matrix = self.vectorizer.fit_transform(self._texts).tocsr()
+        except ValueError:
+            # Corpus vacío o sin términos útiles: el índice queda sin ajustar
+            self.vectorizer = None
+            self.matrix = None
+        self._fitted_rows = len(self._texts)
+        self.version += 1
+
+    def add(self, keys, texts):
+        """Añade filas usando el vocabulario actual, sin reajustar el IDF"""
+        texts = [text or "" for text in texts]
+        if not texts:
+            return
+        if not self.is_fitted:
+            self.fit(np.concatenate([self.keys, np.asarray(keys, dtype=np.int64)]), self._texts + texts)
+            return
+
+        from scipy import sparse
+
+        self.matrix = sparse.vstack([self.matrix, self.vectorizer.transform(texts)], format='csr')
+        self.keys = np.concatenate([self.keys, np.asarray(keys, dtype=np.int64)])
+        self._texts.extend(texts)
+
+        # Los términos nuevos no entran en el vocabulario hasta el siguiente ajuste
+        if len(self._texts) - self._fitted_rows > self.refit_ratio * max(self._fitted_rows, 1):
+            self.fit(self.keys, self._texts)
+
+    def take(self, rows):
+        """Conserva únicamente las filas indicadas (máscara booleana o índices)"""
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        self.keys = self.keys[rows]
+        self._texts = [self._texts[row] for row in rows]
+        if self.matrix is not None:
+            self.matrix = self.matrix[rows]
+        self._fitted_rows = min(self._fitted_rows, len(self.keys))
+
+    def vector(self, query: str):
+        """Vectoriza una consulta con el vocabulario del índice"""
+        if not self.is_fitted:
+            return None
+        return self.vectorizer.transform([query or ""])
+
+    def scores(self, query: str, rows=None) -> np.ndarray:
+        """Devuelve la similitud coseno de la consulta contra todas las filas del índice"""
+        return self.vector_scores(self.vector(query), rows)
+
+    def vector_scores(self, query_vector, rows=None) -> np.ndarray:
+        """Similitud coseno de un vector ya calculado, opcionalmente sólo para algunas filas"""
+        size = len(self.keys) if rows is None else len(rows)
+        if query_vector is None or not size:
+            return np.zeros(size)
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        # Las filas ya están normalizadas, el producto es directamente el coseno
+        return np.asarray((matrix @ query_vector.T).todense()).ravel()
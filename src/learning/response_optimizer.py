@@ -1,71 +1,144 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import copy
+import threading
+
 import numpy as np
-from datetime import datetime, timedelta
-from src.database.models import ResponseTemplate, Interaction
+from src.database.models import Interaction
+from src.learning.ann_index import RandomProjectionLSH
+from src.learning.candidate_store import CandidateStore, NO_TEMPLATE
+from src.learning.template_metrics import TemplateMetricsBuffer, increment_template_metrics
+from src.learning.template_registry import CompiledTemplate, TemplateRegistry
 
 class ResponseOptimizer:
-    def __init__(self, session):
+    def __init__(self, session, min_feedback: float = 4.0, window_days: int = 30,
+                 refresh_interval: float = 30.0, max_candidates: int = 200_000,
+                 retrieval: str = 'exact', ann_top_k: int = 300, ann_params: dict = None,
+                 metrics_buffer: TemplateMetricsBuffer = None):
+        if retrieval not in ('exact', 'ann'):
+            raise ValueError(f"Modo de recuperación desconocido: {retrieval}")
         self.session = session
-        self.vectorizer = TfidfVectorizer()
-
-    def analyze_query(self, query: str, context: dict):
+        self.min_feedback = min_feedback
+        self.retrieval = retrieval
+        # Candidatos por similitud de texto que se reordenan con el contexto en modo 'ann'
+        self.ann_top_k = ann_top_k
+        self.store = CandidateStore(
+            min_feedback=min_feedback,
+            window_days=window_days,
+            max_rows=max_candidates,
+            refresh_interval=refresh_interval,
+            ann=RandomProjectionLSH(**(ann_params or {})) if retrieval == 'ann' else None
+        )
+        # Plantillas compiladas en memoria: se filtran las que el contexto no puede rellenar
+        self.templates = TemplateRegistry(refresh_interval=refresh_interval)
+        # Si se indica, el feedback de plantillas se agrega en memoria y se vuelca por lotes
+        self.metrics_buffer = metrics_buffer
+        # La ventana se comparte entre peticiones concurrentes (ver with_session)
+        self._lock = threading.RLock()
+
+    @property
+    def encoder(self):
+        # La recarga completa de la ventana sustituye también su codificador
+        return self.store.encoder
+
+    def with_session(self, session):
+        """Vista del optimizador ligada a otra sesión que comparte la ventana en memoria"""
+        bound = copy.copy(self)
+        bound.session = session
+        return bound
+
+    def refresh(self, force: bool = False):
+        """Sincroniza la ventana de candidatos con la base de datos si ha vencido su intervalo"""
+        with self._lock:
+            self.store.refresh(self.session, force)
+            self.templates.refresh(self.session, force)
+
+    def analyze_query(self, query: str, context: dict) -> CompiledTemplate:
         """Analiza la consulta y determina la mejor plantilla de respuesta basada en el histórico"""
-        # Vectorizar la consulta
-        query_vector = self.vectorizer.fit_transform([query])
-
-        # Obtener interacciones exitosas recientes
-        successful_interactions = self.session.query(Interaction) \
-            .filter(Interaction.feedback_score >= 4.0) \
-            .filter(Interaction.timestamp >= datetime.now() - timedelta(days=30)) \
-            .all()
-
-        best_template = None
-        best_score = 0
-
-        for interaction in successful_interactions:
-            # Calcular similitud de la consulta
-            similarity = cosine_similarity(
-                query_vector,
-                self.vectorizer.transform([interaction.query])
-            )[0][0]
-
-            # Calcular similitud del contexto
-            context_score = self.calculate_context_similarity(
-                context,
-                interaction.context
-            )
-
-            # Combinar puntuaciones
-            combined_score = similarity * 0.7 + context_score * 0.3
-
-            if combined_score > best_score:
-                best_score = combined_score
-                best_template = interaction.template
-
-        return best_template
+        # La ventana sólo consulta la base de datos cuando vence su intervalo
+        with self._lock:
+            self.refresh()
+
+            best = self.best_candidate(query, context)
+            template_id = self.store.template_ids[best] if best is not None else NO_TEMPLATE
+        if template_id == NO_TEMPLATE:
+            return None
+        return self.templates.get(int(template_id))
+
+    def best_candidate(self, query: str, context: dict):
+        """
+        Devuelve la fila de la ventana con mejor puntuación combinada, o None.
+        Se descartan las filas cuya plantilla no se puede rellenar con el contexto
+        """
+        if self.retrieval == 'ann':
+            rows, scores = self.score_approximate(query, context)
+        else:
+            scores = self.score_candidates(query, context)
+            rows = np.arange(len(scores))
+        if not len(scores):
+            return None
+
+        template_ids = self.store.template_ids[rows]
+        while True:
+            best = int(np.argmax(scores))
+            if scores[best] <= 0:
+                return None
+            template_id = int(template_ids[best])
+            if template_id == NO_TEMPLATE or self.templates.renderable([template_id], context):
+                return int(rows[best])
+            # Plantilla inutilizable para este contexto: fuera todas sus filas
+            scores[template_ids == template_id] = -np.inf
+
+    def score_candidates(self, query: str, context: dict) -> np.ndarray:
+        """Puntuación combinada de la consulta contra todos los candidatos"""
+        # Similitud de la consulta y del contexto contra todo el histórico en bloque
+        similarities = self.store.index.scores(query)
+        context_scores = self.encoder.similarity(context, self.store.contexts)
+
+        # Combinar puntuaciones
+        return similarities * 0.7 + context_scores * 0.3
+
+    def score_approximate(self, query: str, context: dict):
+        """Recupera candidatos con LSH y reordena los top-k con la puntuación combinada"""
+        query_vector = self.store.index.vector(query)
+        if query_vector is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        rows = self.store.ann.query(query_vector)
+        similarities = self.store.index.vector_scores(query_vector, rows)
+        if len(rows) > self.ann_top_k:
+            top = np.sort(np.argsort(-similarities, kind='stable')[:self.ann_top_k])
+            rows, similarities = rows[top], similarities[top]
+
+        context_scores = self.encoder.similarity(context, self.store.contexts, rows)
+        return rows, similarities * 0.7 + context_scores * 0.3
+
+    def add_interaction(self, interaction: Interaction):
+        """Incorpora una interacción con buen feedback a la ventana sin esperar al refresco"""
+        if not self.store.is_loaded:
+            return
+        if interaction.feedback_score is None or interaction.feedback_score < self.min_feedback:
+            return
+        with self._lock:
+            self.store.add_rows([interaction])
 
     def update_template_metrics(self, template_id: int, feedback_score: float):
         """Actualiza las métricas de la plantilla basado en el feedback"""
-        template = self.session.query(ResponseTemplate).get(template_id)
+        success = feedback_score >= self.min_feedback
 
-        # Actualizar promedios
-        template.use_count += 1
-        template.average_feedback = (
-                (template.average_feedback * (template.use_count - 1) + feedback_score)
-                / template.use_count
-        )
-        template.last_updated = datetime.utcnow()
-
-        # Actualizar tasa de éxito
-        if feedback_score >= 4.0:
-            template.success_rate = (
-                    (template.success_rate * (template.use_count - 1) + 1)
-                    / template.use_count
-            )
+        # Modo por lotes: acumular en memoria y volcar periódicamente
+        if self.metrics_buffer is not None:
+            if self.metrics_buffer.add(template_id, feedback_score, success):
+                self.metrics_buffer.flush(self.session)
+            return
 
+        # Incremento atómico en SQL: sin lectura previa no hay actualizaciones perdidas
+        increment_template_metrics(self.session, template_id, 1, feedback_score, int(success))
         self.session.commit()
 
+    def flush_metrics(self):
+        """Vuelca el feedback acumulado en modo por lotes"""
+        if self.metrics_buffer is not None:
+            self.metrics_buffer.flush(self.session)
+
     def calculate_context_similarity(self, context1: dict, context2: dict):
         """Calcula la similitud entre dos contextos"""
         similarity_score = 0
@@ -0,0 +1,206 @@
+from datetime import datetime
+from typing import Dict, Iterator
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from src.database.models import Interaction, ResponseTemplate
+
+# Reglas de los indicadores de éxito, compartidas por el cálculo en línea y el batch
+POSITIVE_WORDS = ('gracias', 'excelente', 'perfecto', 'genial', 'ayuda')
+NEGATIVE_WORDS = ('problema', 'error', 'mal', 'queja', 'insatisfecho')
+BOOKING_WORD = 'reserva'
+# Palabras de la respuesta a partir de las que la interacción es 'medium' y 'complex'
+COMPLEXITY_THRESHOLDS = (20, 50)
+COMPLEXITY_LEVELS = ('simple', 'medium', 'complex')
+
+
+def sentiment_score(text: str) -> float:
+    text = text.lower()
+    positive_count = sum(1 for word in POSITIVE_WORDS if word in text)
+    negative_count = sum(1 for word in NEGATIVE_WORDS if word in text)
+
+    total = positive_count + negative_count
+    if total == 0:
+        return 0.5
+    return positive_count / total
+
+
+def complexity_level(response: str) -> str:
+    response_length = len(response.split())
+    for threshold, level in zip(COMPLEXITY_THRESHOLDS, COMPLEXITY_LEVELS):
+        if response_length < threshold:
+            return level
+    return COMPLEXITY_LEVELS[-1]
+
+
+def _flags(texts, keyword: str) -> np.ndarray:
+    return np.fromiter((keyword in text for text in texts), dtype=bool, count=len(texts))
+
+
+def success_indicators_frame(frame, now: datetime = None):
+    """
+    Indicadores de éxito de un lote de interacciones, equivalentes a los del
+    cálculo en línea. Cada palabra clave se busca columna a columna sobre las
+    respuestas ya en minúsculas y los indicadores se combinan con numpy.
+    `frame` necesita las columnas response y timestamp; response_time se mide
+    hasta feedback_timestamp si existe, o hasta `now`
+    """
+    import pandas as pd
+
+    responses = ['' if text is None else str(text) for text in frame['response']]
+    lowered = [text.lower() for text in responses]
+    positive = sum(_flags(lowered, word).astype(np.int64) for word in POSITIVE_WORDS)
+    negative = sum(_flags(lowered, word).astype(np.int64) for word in NEGATIVE_WORDS)
+    total = positive + negative
+    sentiment = np.divide(positive, total, out=np.full(len(frame), 0.5), where=total > 0)
+
+    words = np.fromiter(map(len, map(str.split, responses)), dtype=np.int64, count=len(responses))
+    levels = np.array(COMPLEXITY_LEVELS, dtype=object)[np.searchsorted(COMPLEXITY_THRESHOLDS, words, side='right')]
+
+    reference = pd.Series(pd.Timestamp(now or datetime.utcnow()), index=frame.index)
+    if 'feedback_timestamp' in frame:
+        reference = pd.to_datetime(frame['feedback_timestamp']).fillna(reference)
+    response_time = (reference - pd.to_datetime(frame['timestamp'])).dt.total_seconds()
+
+    return pd.DataFrame({
+        'response_time': response_time.to_numpy(dtype=np.float64),
+        'led_to_booking': _flags(lowered, BOOKING_WORD),
+        'required_followup': False,
+        'sentiment_score': sentiment,
+        'complexity_level': levels
+    }, index=frame.index)
+
+
+class MetricsRebuilder:
+    """
+    Recalcula desde cero los indicadores de éxito de las interacciones con
+    feedback y las métricas acumuladas de todas las plantillas, leyendo la
+    tabla por bloques. Pensado para ejecutarse fuera de línea cuando cambian
+    las reglas de puntuación o con el feedback en modo crudo (FEEDBACK_RAW_ONLY)
+    """
+
+    COLUMNS = (
+        Interaction.id,
+        Interaction.timestamp,
+        Interaction.response,
+        Interaction.template_id,
+        Interaction.feedback_score,
+        Interaction.feedback_timestamp
+    )
+
+    def __init__(self, session: Session, min_feedback: float = 4.0, chunk_size: int = 20_000, archive=None):
+        self.session = session
+        self.min_feedback = min_feedback
+        self.chunk_size = chunk_size
+        # InteractionArchive opcional: su feedback también cuenta para las métricas de plantilla
+        self.archive = archive
+
+    def chunks(self) -> Iterator:
+        """Interacciones con feedback en DataFrames de chunk_size filas, paginando por id"""
+        import pandas as pd
+
+        last_id = 0
+        while True:
+            rows = self.session.execute(
+                select(*self.COLUMNS)
+                .where(Interaction.feedback_score.isnot(None), Interaction.id > last_id)
+                .order_by(Interaction.id)
+                .limit(self.chunk_size)
+            ).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+            yield pd.DataFrame(rows, columns=[column.key for column in self.COLUMNS])
+
+    def rebuild(self, indicators: bool = True, templates: bool = True) -> Dict[str, int]:
+        import pandas as pd
+
+        stats = {'interactions': 0, 'templates': 0}
+        totals = []
+        now = datetime.utcnow()
+        try:
+            for frame in self.chunks():
+                if indicators:
+                    self._write_indicators(frame, now)
+                if templates:
+                    totals.append(self._template_totals(frame))
+                stats['interactions'] += len(frame)
+
+            if templates:
+                if self.archive is not None:
+                    archived = self.archive.read(columns=['template_id', 'feedback_score']) \
+                        .reindex(columns=['template_id', 'feedback_score'])
+                    totals.append(self._template_totals(archived.dropna(subset=['feedback_score'])))
+                combined = pd.concat(totals).groupby(level=0).sum() if totals else pd.DataFrame()
+                stats['templates'] = self._write_templates(combined)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return stats
+
+    def _write_indicators(self, frame, now: datetime):
+        computed = success_indicators_frame(frame, now)
+        records = computed.to_dict('records')
+        # UPDATE masivo por clave primaria
+        self.session.execute(update(Interaction), [
+            {'id': int(interaction_id), 'success_indicators': {
+                key: value.item() if isinstance(value, np.generic) else value for key, value in record.items()
+            }}
+            for interaction_id, record in zip(frame['id'], records)
+        ])
+
+    def _template_totals(self, frame):
+        """Usos, suma de puntuaciones y éxitos por plantilla de un bloque"""
+        import pandas as pd
+
+        frame = frame.dropna(subset=['template_id'])
+        scores = frame['feedback_score'].astype(float).to_numpy()
+        return pd.DataFrame({
+            'template_id': frame['template_id'].astype('int64').to_numpy(),
+            'use_count': 1,
+            'feedback_sum': scores,
+            'success_count': (scores >= self.min_feedback).astype(np.int64)
+        }).groupby('template_id').sum()
+
+    def _write_templates(self, totals) -> int:
+        """Sustituye los acumuladores de todas las plantillas; las que no tienen feedback quedan a cero"""
+        template_ids = self.session.scalars(select(ResponseTemplate.id)).all()
+        rows = []
+        for template_id in template_ids:
+            if template_id in totals.index:
+                use_count, feedback_sum, success_count = totals.loc[template_id, ['use_count', 'feedback_sum',
+                                                                                  'success_count']]
+            else:
+                use_count, feedback_sum, success_count = 0, 0.0, 0
+            rows.append({'id': template_id, 'use_count': int(use_count), 'feedback_sum': float(feedback_sum),
+                         'success_count': int(success_count)})
+        if rows:
+            self.session.execute(update(ResponseTemplate), rows)
+        return len(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.database.archive import InteractionArchive
+    from src.database.crud import get_engine, get_session_factory, init_db
+
+    parser = argparse.ArgumentParser(description="Recalcula indicadores de éxito y métricas de plantillas")
+    parser.add_argument('--min-feedback', type=float, default=4.0)
+    parser.add_argument('--chunk-size', type=int, default=20_000)
+    parser.add_argument('--include-archive', action='store_true',
+                        help="Suma el feedback archivado en Parquet a las métricas de plantilla")
+    parser.add_argument('--skip-indicators', action='store_true')
+    args = parser.parse_args()
+
+    init_db(get_engine())
+    session = get_session_factory()()
+    try:
+        rebuilder = MetricsRebuilder(session, args.min_feedback, args.chunk_size,
+                                     InteractionArchive() if args.include_archive else None)
+        print(rebuilder.rebuild(indicators=not args.skip_indicators))
+    finally:
+        session.close()
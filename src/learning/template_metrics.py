@@ -0,0 +1,121 @@
+import atexit
+import threading
+import time
+
+from sqlalchemy import func, update
+
+from src.database.models import ResponseTemplate
+
+
+def increment_template_metrics(session, template_id: int, uses: int,
+                               feedback_sum: float, successes: int):
+    """
+    Suma a los acumuladores de una plantilla con un UPDATE atómico, sin leer la
+    fila. No toca last_updated: marca cambios del texto (ver TemplateRegistry)
+    """
+    session.execute(
+        update(ResponseTemplate)
+        .where(ResponseTemplate.id == template_id)
+        .values(
+            use_count=func.coalesce(ResponseTemplate.use_count, 0) + uses,
+            feedback_sum=func.coalesce(ResponseTemplate.feedback_sum, 0.0) + feedback_sum,
+            success_count=func.coalesce(ResponseTemplate.success_count, 0) + successes
+        )
+    )
+
+
+class TemplateMetricsBuffer:
+    """
+    Agrega el feedback en memoria y lo vuelca periódicamente, un UPDATE por
+    plantilla. Con session_factory un hilo propio vuelca cada flush_interval
+    segundos (aunque deje de llegar feedback) fuera de las peticiones
+    """
+
+    def __init__(self, flush_interval: float = 5.0, max_pending: int = 500, session_factory=None):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.session_factory = session_factory
+        self._totals = {}  # template_id -> [usos, suma de puntuaciones, éxitos]
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._worker = None
+        if session_factory is not None:
+            self._worker = threading.Thread(target=self._run, name="template-metrics", daemon=True)
+            self._worker.start()
+            atexit.register(self.close)
+
+    def __len__(self):
+        return self._pending
+
+    def add(self, template_id: int, feedback_score: float, success: bool) -> bool:
+        """
+        Acumula un feedback; devuelve True si corresponde que el llamante vuelque.
+        Con hilo propio nunca: se le despierta para volcar en segundo plano
+        """
+        with self._lock:
+            totals = self._totals.setdefault(template_id, [0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += feedback_score
+            totals[2] += int(success)
+            self._pending += 1
+            due = self._pending >= self.max_pending or \
+                time.monotonic() - self._last_flush >= self.flush_interval
+        if self._worker is not None:
+            if due:
+                self._wakeup.set()
+            return False
+        return due
+
+    def flush(self, session=None):
+        """Aplica los acumulados en una sola transacción (con una sesión propia si no se indica)"""
+        if session is None:
+            with self.session_factory() as own_session:
+                return self.flush(own_session)
+
+        with self._lock:
+            totals, self._totals = self._totals, {}
+            self._pending = 0
+            self._last_flush = time.monotonic()
+        if not totals:
+            return
+
+        try:
+            for template_id, (uses, feedback_sum, successes) in totals.items():
+                increment_template_metrics(session, template_id, uses, feedback_sum, successes)
+            session.commit()
+        except Exception:
+            session.rollback()
+            # Reincorporar los acumulados para no perder feedback
+            with self._lock:
+                for template_id, (uses, feedback_sum, successes) in totals.items():
+                    current = self._totals.setdefault(template_id, [0, 0.0, 0])
+                    current[0] += uses
+                    current[1] += feedback_sum
+                    current[2] += successes
+                    self._pending += uses
+            raise
+
+    def close(self):
+        """Detiene el hilo de volcado y escribe lo pendiente"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._worker is not None:
+            self._wakeup.set()
+            self._worker.join()
+            self.flush()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._pending:
+                try:
+                    self.flush()
+                except Exception as e:
+                    # Los acumulados ya se han reincorporado: se reintenta en el siguiente ciclo
+                    print(f"Error flushing template metrics: {str(e)}")
@@ -0,0 +1,125 @@
+import string
+import time
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from src.database.models import ResponseTemplate
+
+# Marca de las plantillas con campos posicionales: nunca se pueden rellenar desde el contexto
+_POSITIONAL = '\0positional'
+
+
+def placeholder_fields(text: str) -> Optional[FrozenSet[str]]:
+    """
+    Nombres de contexto que necesita la plantilla ({vehicle_type}, {context.season}
+    y {prices[0]} requieren 'vehicle_type', 'context' y 'prices'), o None si el
+    texto no es una plantilla de formato válida
+    """
+    fields = set()
+    try:
+        for _, field_name, _, _ in string.Formatter().parse(text or ""):
+            if field_name is None:
+                continue
+            root = field_name.split('.', 1)[0].split('[', 1)[0]
+            fields.add(_POSITIONAL if not root or root.isdigit() else root)
+    except ValueError:
+        return None
+    return frozenset(fields)
+
+
+class CompiledTemplate:
+    """Plantilla de respuesta en memoria con sus placeholders ya analizados"""
+
+    __slots__ = ('id', 'category_id', 'category_name', 'template', 'fields', 'last_updated')
+
+    def __init__(self, id: int, category_id: int, category_name: str, template: str,
+                 fields: FrozenSet[str], last_updated: datetime):
+        self.id = id
+        self.category_id = category_id
+        self.category_name = category_name
+        self.template = template
+        self.fields = fields
+        self.last_updated = last_updated
+
+    @classmethod
+    def from_row(cls, row: ResponseTemplate) -> Optional['CompiledTemplate']:
+        fields = placeholder_fields(row.template)
+        if fields is None or _POSITIONAL in fields:
+            return None
+        return cls(row.id, row.category_id, row.category.name if row.category else None,
+                   row.template, fields, row.last_updated)
+
+    def can_render(self, context: Dict[str, Any]) -> bool:
+        return self.fields.issubset(context.keys())
+
+    def render(self, context: Dict[str, Any]) -> Optional[str]:
+        """Texto de la respuesta, o None si el contexto no la satisface"""
+        if not self.can_render(context):
+            return None
+        try:
+            return self.template.format(**context)
+        except (KeyError, IndexError, AttributeError, ValueError, TypeError):
+            # Un placeholder con índice o atributo que el valor del contexto no tiene
+            return None
+
+
+class TemplateRegistry:
+    """
+    Plantillas de respuesta cargadas una sola vez y compiladas. Cada refresco
+    sólo recarga las plantillas cuyo last_updated ha cambiado
+    """
+
+    def __init__(self, refresh_interval: float = 30.0):
+        self.refresh_interval = refresh_interval
+        self._templates: Dict[int, CompiledTemplate] = {}
+        self._versions: Dict[int, datetime] = {}
+        self._last_refresh = None
+
+    def __len__(self):
+        return len(self._templates)
+
+    def get(self, template_id: int) -> Optional[CompiledTemplate]:
+        return self._templates.get(template_id)
+
+    def refresh(self, session, force: bool = False):
+        """Sincroniza con la tabla de plantillas si ha vencido el intervalo"""
+        now = time.monotonic()
+        if not force and self._last_refresh is not None \
+                and now - self._last_refresh < self.refresh_interval:
+            return
+
+        versions = dict(session.execute(select(ResponseTemplate.id, ResponseTemplate.last_updated)).all())
+        changed = [template_id for template_id, last_updated in versions.items()
+                   if template_id not in self._versions or self._versions[template_id] != last_updated]
+        for template_id in set(self._versions) - set(versions):
+            self._templates.pop(template_id, None)
+        if changed:
+            self._load(session, changed)
+        self._versions = versions
+        self._last_refresh = now
+
+    def _load(self, session, template_ids: Iterable[int], chunk_size: int = 500):
+        template_ids = list(template_ids)
+        for start in range(0, len(template_ids), chunk_size):
+            rows = session.execute(
+                select(ResponseTemplate)
+                .options(joinedload(ResponseTemplate.category))
+                .where(ResponseTemplate.id.in_(template_ids[start:start + chunk_size]))
+            ).scalars()
+            for row in rows:
+                compiled = CompiledTemplate.from_row(row)
+                if compiled is None:
+                    self._templates.pop(row.id, None)
+                else:
+                    self._templates[row.id] = compiled
+
+    def renderable(self, template_ids: Iterable[int], context: Dict[str, Any]) -> set:
+        """Subconjunto de plantillas que el contexto puede rellenar por completo"""
+        keys = context.keys()
+        return {
+            template_id for template_id in template_ids
+            if (template := self._templates.get(template_id)) is not None and template.fields.issubset(keys)
+        }
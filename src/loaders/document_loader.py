@@ -0,0 +1,219 @@
+import os
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from src.config import Config
+from src.database.models import DocumentChunk
+from src.loaders.manifest import IngestionManifest
+from src.utils.helpers import process_map
+
+
+def _parse_pdf(path: str) -> List[str]:
+    from unstructured.partition.pdf import partition_pdf
+
+    elements = partition_pdf(filename=path, strategy="fast")
+    if not any(str(element).strip() for element in elements):
+        # PDF escaneado sin capa de texto: OCR con tesseract
+        elements = partition_pdf(filename=path, strategy="ocr_only")
+    return [str(element) for element in elements]
+
+
+def _parse_docx(path: str) -> List[str]:
+    import docx
+
+    document = docx.Document(path)
+    sections = [paragraph.text for paragraph in document.paragraphs]
+    for table in document.tables:
+        for row in table.rows:
+            sections.append(" | ".join(cell.text.strip() for cell in row.cells))
+    return sections
+
+
+def _parse_pptx(path: str) -> List[str]:
+    from pptx import Presentation
+
+    sections = []
+    for slide in Presentation(path).slides:
+        for shape in slide.shapes:
+            if shape.has_text_frame:
+                sections.append(shape.text_frame.text)
+    return sections
+
+
+def _parse_html(path: str) -> List[str]:
+    from bs4 import BeautifulSoup
+
+    with open(path, 'rb') as f:
+        soup = BeautifulSoup(f.read(), 'html.parser')
+    for element in soup(['script', 'style', 'noscript']):
+        element.decompose()
+    return soup.get_text("\n").split("\n")
+
+
+PARSERS = {
+    '.pdf': _parse_pdf,
+    '.docx': _parse_docx,
+    '.pptx': _parse_pptx,
+    '.html': _parse_html,
+    '.htm': _parse_html,
+}
+
+
+def parse_document(path: str) -> List[str]:
+    """Extrae las secciones de texto de un documento según su extensión"""
+    parser = PARSERS.get(os.path.splitext(path)[1].lower())
+    if parser is None:
+        raise ValueError(f"Formato de documento no soportado: {path}")
+    return parser(path)
+
+
+def chunk_text(sections: List[str], chunk_size: int = 1000, overlap: int = 150) -> List[str]:
+    """
+    Divide el texto en fragmentos de hasta `chunk_size` caracteres que se
+    solapan `overlap` caracteres, cortando preferentemente entre párrafos o frases
+    """
+    paragraphs = (" ".join(section.split()) for section in sections)
+    text = "\n\n".join(paragraph for paragraph in paragraphs if paragraph)
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            # Buscar un corte natural en la segunda mitad de la ventana
+            boundary = text.rfind("\n\n", start + chunk_size // 2, end)
+            if boundary == -1:
+                boundary = text.rfind(". ", start + chunk_size // 2, end)
+                boundary = boundary + 1 if boundary != -1 else -1
+            if boundary != -1:
+                end = boundary
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def _parse_and_chunk(path: str, chunk_size: int, overlap: int) -> List[str]:
+    return chunk_text(parse_document(path), chunk_size, overlap)
+
+
+# (clave relativa, ruta, stat, hash del contenido)
+PendingDocument = Tuple[str, str, os.stat_result, str]
+
+
+class DocumentLoader:
+    """
+    Ingesta incremental de las fichas técnicas de vehículos: descubre los
+    documentos, descarta los que no han cambiado según el manifiesto, los
+    analiza y fragmenta en un pool de procesos y guarda los fragmentos
+    """
+
+    def __init__(self, session: Session, directory: str = None, manifest_path: str = None,
+                 processes: int = None, chunk_size: int = None, chunk_overlap: int = None,
+                 save_every: int = 50):
+        self.session = session
+        self.directory = directory or Config.VEHICLE_SPECS_PATH
+        self.manifest = IngestionManifest(manifest_path or os.path.join(self.directory, ".manifest.json"))
+        self.processes = processes if processes is not None else (Config.INGEST_PROCESSES or os.cpu_count())
+        self.chunk_size = chunk_size or Config.DOCUMENT_CHUNK_SIZE
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else Config.DOCUMENT_CHUNK_OVERLAP
+        # Documentos almacenados entre escrituras del manifiesto
+        self.save_every = save_every
+
+    def discover(self) -> Iterator[Tuple[str, str]]:
+        """Recorre el directorio y devuelve (clave relativa, ruta) de los documentos soportados"""
+        for root, dirs, files in os.walk(self.directory):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for name in sorted(files):
+                if name.startswith('.') or os.path.splitext(name)[1].lower() not in PARSERS:
+                    continue
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, self.directory), path
+
+    def ingest(self, force: bool = False) -> Dict[str, int]:
+        """
+        Procesa los documentos nuevos o modificados y elimina los fragmentos de
+        los que ya no existen. Con force se reprocesan todos
+        """
+        stats = {'scanned': 0, 'skipped': 0, 'ingested': 0, 'chunks': 0, 'failed': 0, 'removed': 0}
+        seen = []
+
+        def pending() -> Iterator[PendingDocument]:
+            for key, path in self.discover():
+                stats['scanned'] += 1
+                seen.append(key)
+                stat = os.stat(path)
+                digest = self.manifest.changed_digest(key, path, stat)
+                if digest is None and force:
+                    digest = self.manifest.entries[key]['sha256']
+                if digest is None:
+                    stats['skipped'] += 1
+                    continue
+                yield key, path, stat, digest
+
+        try:
+            for document, chunks, error in self._parse(pending()):
+                key = document[0]
+                if error is not None:
+                    # Sin entrada en el manifiesto: se reintenta en la siguiente ejecución
+                    stats['failed'] += 1
+                    print(f"Error ingesting {key}: {error}")
+                    continue
+                self._store(document, chunks)
+                stats['ingested'] += 1
+                stats['chunks'] += len(chunks)
+                if stats['ingested'] % self.save_every == 0:
+                    self.manifest.save()
+
+            for key in self.manifest.missing(seen):
+                self._remove(key)
+                stats['removed'] += 1
+        finally:
+            self.manifest.save()
+        return stats
+
+    def _parse(self, documents: Iterator[PendingDocument]):
+        """Analiza y fragmenta los documentos, en paralelo si hay más de un proceso"""
+        return process_map(_parse_and_chunk, documents, self.processes,
+                           lambda document: (document[1], self.chunk_size, self.chunk_overlap))
+
+    def _store(self, document: PendingDocument, chunks: List[str]):
+        """Sustituye los fragmentos del documento en una sola transacción"""
+        key, _, stat, digest = document
+        self.session.execute(delete(DocumentChunk).where(DocumentChunk.source == key))
+        if chunks:
+            self.session.execute(insert(DocumentChunk), [
+                {'source': key, 'chunk_index': index, 'text': text, 'content_hash': digest}
+                for index, text in enumerate(chunks)
+            ])
+        self.session.commit()
+        self.manifest.update(key, stat, digest, chunks=len(chunks))
+
+    def _remove(self, key: str):
+        self.session.execute(delete(DocumentChunk).where(DocumentChunk.source == key))
+        self.session.commit()
+        self.manifest.remove(key)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.database.crud import get_engine, get_session_factory, init_db
+
+    parser = argparse.ArgumentParser(description="Ingesta incremental de fichas técnicas de vehículos")
+    parser.add_argument('--directory', default=Config.VEHICLE_SPECS_PATH)
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--force', action='store_true', help="Reprocesar también los documentos sin cambios")
+    args = parser.parse_args()
+
+    init_db(get_engine())
+    session = get_session_factory()()
+    try:
+        print(DocumentLoader(session, args.directory, processes=args.processes).ingest(force=args.force))
+    finally:
+        session.close()
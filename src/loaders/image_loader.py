@@ -0,0 +1,319 @@
+import os
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from src.config import Config
+from src.database.models import VehicleImage
+from src.loaders.manifest import IngestionManifest
+from src.utils.helpers import process_map
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff'}
+
+
+def _register_heif() -> bool:
+    """Pillow sólo abre HEIC con el plugin de pillow-heif (opcional)"""
+    try:
+        from pillow_heif import register_heif_opener
+    except ImportError:
+        return False
+    register_heif_opener()
+    return True
+
+
+# A nivel de módulo para que también lo registren los procesos del pool
+if _register_heif():
+    IMAGE_EXTENSIONS.add('.heic')
+
+HASH_BITS = 64
+_PHASH_SIZE = 32
+# Matriz de la DCT-II para el pHash, calculada una sola vez
+_DCT = np.cos(np.pi * np.outer(np.arange(_PHASH_SIZE), 2 * np.arange(_PHASH_SIZE) + 1) / (2 * _PHASH_SIZE))
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int("".join('1' if bit else '0' for bit in bits.ravel()), 2)
+
+
+def phash(image) -> int:
+    """Hash perceptual: frecuencias bajas (8x8) de la DCT comparadas con su mediana"""
+    from PIL import Image
+
+    pixels = np.asarray(image.convert('L').resize((_PHASH_SIZE, _PHASH_SIZE), Image.LANCZOS), dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:8, :8]
+    return _bits_to_int(low > np.median(low))
+
+
+def dhash(image) -> int:
+    """Hash de diferencias: gradiente horizontal sobre una miniatura de 9x8"""
+    from PIL import Image
+
+    pixels = np.asarray(image.convert('L').resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class HashIndex:
+    """
+    Índice de hashes de 64 bits por bandas. Con max_distance + 1 bandas, dos
+    hashes a distancia de Hamming <= max_distance coinciden en al menos una
+    banda (principio del palomar), así que basta comparar con los candidatos
+    de los buckets en lugar de con todas las imágenes
+    """
+
+    def __init__(self, max_distance: int = 6):
+        self.max_distance = max_distance
+        n_bands = max_distance + 1
+        bounds = np.linspace(0, HASH_BITS, n_bands + 1).astype(int)
+        self._bands = [(int(start), (1 << int(end - start)) - 1) for start, end in zip(bounds[:-1], bounds[1:])]
+        self._buckets = [defaultdict(list) for _ in self._bands]
+        self._hashes = {}
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def _keys(self, value: int):
+        return [(value >> shift) & mask for shift, mask in self._bands]
+
+    def add(self, key: Any, value: int):
+        self._hashes[key] = value
+        for bucket, band_key in zip(self._buckets, self._keys(value)):
+            bucket[band_key].append(key)
+
+    def remove(self, key: Any):
+        value = self._hashes.pop(key, None)
+        if value is None:
+            return
+        for bucket, band_key in zip(self._buckets, self._keys(value)):
+            bucket[band_key].remove(key)
+
+    def query(self, value: int, max_distance: int = None) -> List[Tuple[int, Any]]:
+        """Devuelve (distancia, clave) de los hashes cercanos, de más a menos parecido"""
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        candidates = set()
+        for bucket, band_key in zip(self._buckets, self._keys(value)):
+            candidates.update(bucket.get(band_key, ()))
+        matches = [(hamming(value, self._hashes[key]), key) for key in candidates]
+        return sorted(match for match in matches if match[0] <= max_distance)
+
+
+def _process_image(path: str, thumbnail_path: str, thumbnail_size: int) -> Dict[str, Any]:
+    """Decodifica la imagen a resolución reducida, guarda la miniatura y calcula los hashes"""
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as image:
+        width, height = image.size
+        # En JPEG el decodificador escala por DCT: nunca se descomprime a resolución completa
+        image.draft('RGB', (thumbnail_size, thumbnail_size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((thumbnail_size, thumbnail_size))
+        image = image.convert('RGB')
+
+        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+        image.save(thumbnail_path, 'WEBP', quality=80)
+        return {
+            'width': width,
+            'height': height,
+            'phash': f"{phash(image):016x}",
+            'dhash': f"{dhash(image):016x}",
+            'thumbnail_path': thumbnail_path
+        }
+
+
+# (clave relativa, ruta, stat, hash del contenido)
+PendingImage = Tuple[str, str, os.stat_result, str]
+
+
+class ImageLoader:
+    """
+    Ingesta incremental de las fotos de vehículos y de reportes de daños:
+    miniaturas compactas, hashes perceptuales y detección de casi duplicados
+    mediante un índice de hashes
+    """
+
+    def __init__(self, session: Session, directories: Iterable[str] = None, thumbnail_dir: str = None,
+                 manifest_path: str = None, processes: int = None, thumbnail_size: int = None,
+                 duplicate_distance: int = None, save_every: int = 200):
+        self.session = session
+        self.directories = list(directories or [Config.DAMAGE_REPORTS_PATH, Config.VEHICLE_IMAGES_PATH])
+        self.thumbnail_dir = thumbnail_dir or Config.THUMBNAILS_PATH
+        self.manifest = IngestionManifest(manifest_path or Config.IMAGE_MANIFEST_PATH)
+        self.processes = processes if processes is not None else (Config.INGEST_PROCESSES or os.cpu_count())
+        self.thumbnail_size = thumbnail_size or Config.IMAGE_THUMBNAIL_SIZE
+        self.duplicate_distance = duplicate_distance if duplicate_distance is not None \
+            else Config.IMAGE_DUPLICATE_DISTANCE
+        self.save_every = save_every
+        self.index = None  # Índice de pHash de las imágenes canónicas, se construye al ingerir
+        self._stale_thumbnails = set()  # Miniaturas de filas borradas, se eliminan al acabar la ingesta
+
+    def discover(self) -> Iterator[Tuple[str, str]]:
+        """
+        Recorre los directorios de forma perezosa y devuelve (clave relativa,
+        ruta) de las imágenes. La clave es la ruta relativa al directorio,
+        precedida de su nombre, y no depende del directorio de trabajo
+        """
+        for directory in self.directories:
+            prefix = os.path.basename(os.path.normpath(directory))
+            for root, dirs, files in os.walk(directory):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                for name in sorted(files):
+                    if not name.startswith('.') and os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                        path = os.path.join(root, name)
+                        yield os.path.join(prefix, os.path.relpath(path, directory)), path
+
+    def load_index(self) -> HashIndex:
+        """Construye el índice de hashes con las imágenes canónicas ya almacenadas"""
+        self.index = HashIndex(self.duplicate_distance)
+        rows = self.session.execute(
+            select(VehicleImage.id, VehicleImage.phash).where(VehicleImage.duplicate_of.is_(None))
+        )
+        for image_id, value in rows:
+            self.index.add(image_id, int(value, 16))
+        return self.index
+
+    def find_duplicates(self, path: str, max_distance: int = None) -> List[Tuple[int, int]]:
+        """(distancia, id) de las imágenes almacenadas casi idénticas a la indicada"""
+        from PIL import Image, ImageOps
+
+        if self.index is None:
+            self.load_index()
+        with Image.open(path) as image:
+            image.draft('RGB', (self.thumbnail_size, self.thumbnail_size))
+            return self.index.query(phash(ImageOps.exif_transpose(image)), max_distance)
+
+    def ingest(self) -> Dict[str, int]:
+        """Procesa las imágenes nuevas o modificadas y elimina las que ya no existen"""
+        stats = {'scanned': 0, 'skipped': 0, 'ingested': 0, 'duplicates': 0, 'failed': 0, 'removed': 0,
+                 'thumbnails_removed': 0}
+        seen = []
+        self.load_index()
+
+        def pending() -> Iterator[PendingImage]:
+            for key, path in self.discover():
+                stats['scanned'] += 1
+                seen.append(key)
+                stat = os.stat(path)
+                digest = self.manifest.changed_digest(key, path, stat)
+                if digest is None:
+                    stats['skipped'] += 1
+                    continue
+                yield key, path, stat, digest
+
+        try:
+            for image, result, error in self._process(pending()):
+                if error is not None:
+                    stats['failed'] += 1
+                    print(f"Error ingesting {image[0]}: {error}")
+                    continue
+                if self._store(image, result) is not None:
+                    stats['duplicates'] += 1
+                stats['ingested'] += 1
+                if stats['ingested'] % self.save_every == 0:
+                    self.manifest.save()
+
+            for key in self.manifest.missing(seen):
+                self._remove(key)
+                stats['removed'] += 1
+        finally:
+            self.manifest.save()
+            stats['thumbnails_removed'] = self._purge_thumbnails()
+        return stats
+
+    def _purge_thumbnails(self) -> int:
+        """
+        Borra las miniaturas que ya no usa ninguna imagen. Son por contenido y
+        pueden compartirse, y una imagen aún en proceso puede haber escrito la
+        misma: por eso se comprueba al final de la ingesta y no al borrar la fila
+        """
+        if not self._stale_thumbnails:
+            return 0
+        used = set(self.session.scalars(
+            select(VehicleImage.thumbnail_path).where(VehicleImage.thumbnail_path.in_(self._stale_thumbnails))
+        ))
+        removed = 0
+        for path in self._stale_thumbnails - used:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        self._stale_thumbnails.clear()
+        return removed
+
+    def _thumbnail_path(self, digest: str) -> str:
+        # Por contenido: copias exactas comparten miniatura
+        return os.path.join(self.thumbnail_dir, digest[:2], f"{digest}.webp")
+
+    def _process(self, images: Iterator[PendingImage]):
+        """Decodifica las imágenes, en paralelo si hay más de un proceso"""
+        return process_map(_process_image, images, self.processes,
+                           lambda image: (image[1], self._thumbnail_path(image[3]), self.thumbnail_size))
+
+    def _store(self, image: PendingImage, result: Dict[str, Any]) -> Optional[int]:
+        """Guarda la imagen; devuelve el id de la imagen canónica si es un casi duplicado"""
+        key, _, stat, digest = image
+        self._delete(key)
+
+        matches = self.index.query(int(result['phash'], 16))
+        duplicate_of = matches[0][1] if matches else None
+        image_id = self.session.execute(
+            insert(VehicleImage).values(source=key, content_hash=digest, duplicate_of=duplicate_of, **result)
+        ).inserted_primary_key[0]
+        self.session.commit()
+
+        if duplicate_of is None:
+            self.index.add(image_id, int(result['phash'], 16))
+        self.manifest.update(key, stat, digest, image_id=image_id)
+        return duplicate_of
+
+    def _delete(self, key: str):
+        """Elimina la fila de la imagen; si era canónica, su primer duplicado pasa a serlo"""
+        row = self.session.execute(
+            select(VehicleImage.id, VehicleImage.thumbnail_path).where(VehicleImage.source == key)
+        ).first()
+        if row is None:
+            return
+        image_id, thumbnail_path = row
+        if thumbnail_path:
+            self._stale_thumbnails.add(thumbnail_path)
+        duplicates = self.session.scalars(
+            select(VehicleImage.id).where(VehicleImage.duplicate_of == image_id).order_by(VehicleImage.id)
+        ).all()
+        if duplicates:
+            successor = duplicates[0]
+            self.session.execute(update(VehicleImage).where(VehicleImage.id == successor).values(duplicate_of=None))
+            self.session.execute(update(VehicleImage).where(VehicleImage.id.in_(duplicates[1:]))
+                                 .values(duplicate_of=successor))
+            self.index.add(successor, int(self.session.scalar(
+                select(VehicleImage.phash).where(VehicleImage.id == successor)), 16))
+        self.session.execute(delete(VehicleImage).where(VehicleImage.id == image_id))
+        self.index.remove(image_id)
+
+    def _remove(self, key: str):
+        self._delete(key)
+        self.session.commit()
+        self.manifest.remove(key)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.database.crud import get_engine, get_session_factory, init_db
+
+    parser = argparse.ArgumentParser(description="Ingesta incremental de imágenes de vehículos y daños")
+    parser.add_argument('directories', nargs='*')
+    parser.add_argument('--processes', type=int)
+    args = parser.parse_args()
+
+    init_db(get_engine())
+    session = get_session_factory()()
+    try:
+        print(ImageLoader(session, args.directories or None, processes=args.processes).ingest())
+    finally:
+        session.close()
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 del contenido del fichero, leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestionManifest:
+    """
+    Registro en JSON de los ficheros ya ingeridos (tamaño, mtime y hash del
+    contenido) para que las re-ejecuciones sólo procesen lo que ha cambiado
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key: str):
+        return key in self.entries
+
+    def changed_digest(self, key: str, path: str, stat: os.stat_result = None) -> Optional[str]:
+        """
+        Devuelve el hash del fichero si su contenido ha cambiado desde la última
+        ingesta, o None si no. El hash sólo se calcula cuando el tamaño o el
+        mtime no coinciden; si el contenido es el mismo se actualizan éstos
+        """
+        stat = stat or os.stat(path)
+        entry = self.entries.get(key)
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return None
+
+        digest = file_digest(path)
+        if entry is not None and entry['sha256'] == digest:
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            return None
+        return digest
+
+    def update(self, key: str, stat: os.stat_result, digest: str, **info):
+        self.entries[key] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': digest,
+            'ingested_at': datetime.utcnow().isoformat(),
+            **info
+        }
+
+    def remove(self, key: str):
+        self.entries.pop(key, None)
+
+    def missing(self, seen: Iterable[str]) -> List[str]:
+        """Entradas cuyos ficheros ya no existen"""
+        return sorted(set(self.entries) - set(seen))
+
+    def save(self):
+        """Escritura atómica: un fallo a mitad no deja el manifiesto corrupto"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
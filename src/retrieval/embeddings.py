@@ -0,0 +1,130 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from src.config import Config
+
+
+class EmbeddingCache:
+    """
+    Caché en disco (SQLite) de embeddings indexada por el hash del modelo y
+    del texto: un texto sin cambios nunca se vuelve a embeber
+    """
+
+    def __init__(self, path: str = None, model_name: str = None):
+        self.path = path or Config.EMBEDDING_CACHE_PATH
+        self.model_name = model_name or Config.EMBEDDING_MODEL
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        self._lock = threading.Lock()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode()).hexdigest()
+
+    def get_many(self, keys: List[str], chunk_size: int = 500) -> Dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), chunk_size):
+                chunk = keys[start:start + chunk_size]
+                rows = self._connection.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                )
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, items: Iterable):
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                ((key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items)
+            )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class CachedEmbedder:
+    """
+    Calcula embeddings con sentence-transformers por lotes, consultando antes
+    la caché en disco; el modelo sólo se carga si hay textos sin cachear
+    """
+
+    def __init__(self, model_name: str = None, cache: EmbeddingCache = None, batch_size: int = None,
+                 query_cache_size: int = 1024):
+        self.model_name = model_name or Config.EMBEDDING_MODEL
+        self.cache = cache if cache is not None else EmbeddingCache(model_name=self.model_name)
+        self.batch_size = batch_size or Config.EMBEDDING_BATCH_SIZE
+        # Las consultas de clientes nunca van a disco: LRU acotada en memoria
+        self.query_cache_size = query_cache_size
+        self._queries = OrderedDict()
+        self._queries_lock = threading.Lock()
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.computed = 0
+        self.cached = 0
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_name)
+        return self._model
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embeddings normalizados, en float32; las filas se corresponden con `texts`"""
+        return self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                 convert_to_numpy=True, show_progress_bar=False).astype(np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        keys = [self.cache.key(text) for text in texts]
+        vectors = self.cache.get_many(list(set(keys)))
+        self.cached += sum(1 for key in keys if key in vectors)
+
+        # Textos repetidos dentro de la misma llamada se embeben una sola vez
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        missing_keys = list(missing)
+        for start in range(0, len(missing_keys), self.batch_size):
+            batch_keys = missing_keys[start:start + self.batch_size]
+            batch = self.encode([missing[key] for key in batch_keys])
+            self.cache.put_many(zip(batch_keys, batch))
+            vectors.update(zip(batch_keys, batch))
+            self.computed += len(batch_keys)
+
+        return np.vstack([vectors[key] for key in keys])
+
+    def embed_query(self, text: str) -> np.ndarray:
+        with self._queries_lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+                self.cached += 1
+                return vector
+
+        vector = self.encode([text])[0]
+        self.computed += 1
+        if self.query_cache_size > 0:
+            with self._queries_lock:
+                self._queries[text] = vector
+                self._queries.move_to_end(text)
+                while len(self._queries) > self.query_cache_size:
+                    self._queries.popitem(last=False)
+        return vector
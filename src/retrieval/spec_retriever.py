@@ -0,0 +1,130 @@
+import hashlib
+import threading
+from typing import Any, Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.config import Config
+from src.database.models import DocumentChunk
+from src.retrieval.embeddings import CachedEmbedder
+
+
+class SpecRetriever:
+    """
+    Recupera los fragmentos de fichas técnicas más relevantes para una
+    consulta desde un almacén vectorial local (chromadb)
+    """
+
+    def __init__(self, embedder: CachedEmbedder = None, persist_directory: str = None,
+                 collection_name: str = "vehicle_specs", top_k: int = None, max_chars: int = 1500):
+        self.embedder = embedder or CachedEmbedder()
+        self.persist_directory = persist_directory or Config.VECTOR_STORE_PATH
+        self.collection_name = collection_name
+        self.top_k = top_k or Config.RETRIEVAL_TOP_K
+        # Límite de caracteres de fichas que se inyecta en el prompt
+        self.max_chars = max_chars
+        self._collection = None
+        self._lock = threading.Lock()
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            with self._lock:
+                if self._collection is None:
+                    import chromadb
+
+                    client = chromadb.PersistentClient(path=self.persist_directory)
+                    self._collection = client.get_or_create_collection(
+                        self.collection_name, metadata={"hnsw:space": "cosine"}
+                    )
+        return self._collection
+
+    @staticmethod
+    def entry_id(source: str, chunk_index: int, text: str) -> str:
+        """
+        Clave de la entrada por contenido: los ids de document_chunks se reutilizan
+        al re-ingerir un documento, así que un fragmento editado tiene otra clave
+        """
+        return hashlib.sha256(f"{source}\0{chunk_index}\0{text}".encode()).hexdigest()
+
+    def sync(self, session: Session, batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Alinea la colección con la tabla document_chunks: añade los fragmentos
+        nuevos o modificados y borra los que ya no existen. Los textos sin
+        cambios salen de la caché de embeddings
+        """
+        existing = set(self.collection.get(include=[])['ids'])
+        current = set()
+        added = 0
+
+        rows = session.execute(
+            select(DocumentChunk.source, DocumentChunk.chunk_index, DocumentChunk.text)
+        ).yield_per(batch_size)
+        batch = {}
+        for row in rows:
+            entry_id = self.entry_id(row.source, row.chunk_index, row.text)
+            if entry_id not in existing and entry_id not in current:
+                batch[entry_id] = row
+            current.add(entry_id)
+            if len(batch) >= batch_size:
+                added += self._add(batch)
+                batch = {}
+        added += self._add(batch)
+
+        removed = list(existing - current)
+        for start in range(0, len(removed), batch_size):
+            self.collection.delete(ids=removed[start:start + batch_size])
+        return {'added': added, 'removed': len(removed), 'total': len(current)}
+
+    def _add(self, rows: Dict[str, Any]) -> int:
+        if not rows:
+            return 0
+        embeddings = self.embedder.embed([row.text for row in rows.values()])
+        self.collection.add(
+            ids=list(rows),
+            embeddings=embeddings.tolist(),
+            documents=[row.text for row in rows.values()],
+            metadatas=[{'source': row.source, 'chunk_index': row.chunk_index} for row in rows.values()]
+        )
+        return len(rows)
+
+    def retrieve(self, query: str, k: int = None) -> List[Dict[str, Any]]:
+        """Top-k fragmentos más parecidos a la consulta"""
+        if not query or not query.strip():
+            return []
+        result = self.collection.query(
+            query_embeddings=[self.embedder.embed_query(query).tolist()],
+            n_results=k or self.top_k,
+            include=['documents', 'metadatas', 'distances']
+        )
+        return [
+            {'text': text, 'source': metadata.get('source'), 'distance': distance}
+            for text, metadata, distance in zip(result['documents'][0], result['metadatas'][0],
+                                                result['distances'][0])
+        ]
+
+    def format_specs(self, query: str, k: int = None) -> str:
+        """Fragmentos recuperados listos para el prompt, dentro del límite de caracteres"""
+        parts = []
+        remaining = self.max_chars
+        for chunk in self.retrieve(query, k):
+            text = f"[{chunk['source']}] {chunk['text']}"
+            if len(text) > remaining:
+                text = text[:remaining]
+            parts.append(text)
+            remaining -= len(text)
+            if remaining <= 0:
+                break
+        return "\n".join(parts)
+
+
+if __name__ == "__main__":
+    from src.database.crud import get_engine, get_session_factory, init_db
+
+    init_db(get_engine())
+    session = get_session_factory()()
+    try:
+        print(SpecRetriever().sync(session))
+    finally:
+        session.close()
@@ -0,0 +1,39 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+
+def process_map(function: Callable, items: Iterable, processes: int = None,
+                arguments: Callable[[Any], Tuple] = None,
+                per_process: int = 2) -> Iterator[Tuple[Any, Any, Optional[Exception]]]:
+    """
+    Aplica `function` a cada elemento en un pool de procesos y devuelve
+    (elemento, resultado, error) en el orden de entrada. `arguments(elemento)`
+    da los argumentos de la llamada (por defecto, el propio elemento). Como
+    mucho hay `per_process` tareas por proceso en vuelo, así la entrada se
+    consume de forma perezosa. Con processes <= 1 se ejecuta en este proceso
+    """
+    arguments = arguments or (lambda item: (item,))
+    if not processes or processes <= 1:
+        for item in items:
+            try:
+                yield item, function(*arguments(item)), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        in_flight = deque()
+        for item in items:
+            in_flight.append((item, executor.submit(function, *arguments(item))))
+            if len(in_flight) >= processes * per_process:
+                yield _result(*in_flight.popleft())
+        while in_flight:
+            yield _result(*in_flight.popleft())
+
+
+def _result(item, future):
+    try:
+        return item, future.result(), None
+    except Exception as e:
+        return item, None, e
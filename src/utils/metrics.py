@@ -0,0 +1,233 @@
+import bisect
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (segundos) de los buckets de latencia, al estilo Prometheus
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NOOP_SPAN = nullcontext()
+
+
+class Histogram:
+    """Histograma de buckets fijos: contador por bucket, suma y total"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # El último bucket es +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Aproxima un cuantil con el límite superior del bucket que lo contiene"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float('inf')
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'buckets': list(zip(self.buckets, self.counts)),
+            'inf': self.counts[-1],
+            'sum': self.sum,
+            'count': self.count,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99)
+        }
+
+
+class MetricsRegistry:
+    """
+    Contadores e histogramas de latencia por etapa, agregados en proceso.
+    Deshabilitado, cada llamada retorna sin medir ni bloquear
+    """
+
+    def __init__(self, enabled: bool = True, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, stage: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def span(self, stage: str, timings: Dict[str, float] = None):
+        """
+        Mide la duración del bloque como etapa `stage`. Si se pasa `timings`, la
+        duración también se guarda ahí para el detalle de la petición
+        """
+        if not self.enabled and timings is None:
+            return _NOOP_SPAN
+        return self._span(stage, timings)
+
+    @contextmanager
+    def _span(self, stage: str, timings: Dict[str, float]):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if timings is not None:
+                timings[stage] = timings.get(stage, 0.0) + elapsed
+            self.observe(stage, elapsed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'stages': {stage: histogram.snapshot() for stage, histogram in self._histograms.items()}
+            }
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+class MetricsExporter(ABC):
+    """Interfaz de los exportadores: reciben una instantánea del registro"""
+
+    @abstractmethod
+    def export(self, snapshot: Dict[str, Any]):
+        ...
+
+
+class LogExporter(MetricsExporter):
+    """Escribe una línea de log con los contadores y los percentiles por etapa"""
+
+    def __init__(self, log: logging.Logger = None):
+        self.log = log or logger
+
+    def export(self, snapshot: Dict[str, Any]):
+        counters = " ".join(f"{name}={value}" for name, value in sorted(snapshot['counters'].items()))
+        stages = " ".join(
+            f"{stage}[n={data['count']} p50={data['p50'] * 1000:.1f}ms p95={data['p95'] * 1000:.1f}ms]"
+            for stage, data in sorted(snapshot['stages'].items())
+        )
+        self.log.info("metrics %s %s", counters, stages)
+
+
+class PrometheusExporter(MetricsExporter):
+    """Formato de texto de Prometheus; `serve` lo expone en /metrics"""
+
+    def __init__(self, namespace: str = "rentacar"):
+        self.namespace = namespace
+        self.latest = ""
+
+    def export(self, snapshot: Dict[str, Any]):
+        self.latest = self.render(snapshot)
+
+    def render(self, snapshot: Dict[str, Any]) -> str:
+        lines: List[str] = []
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = f"{self.namespace}_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+
+        metric = f"{self.namespace}_stage_seconds"
+        if snapshot['stages']:
+            lines.append(f"# TYPE {metric} histogram")
+        for stage, data in sorted(snapshot['stages'].items()):
+            cumulative = 0
+            for bound, count in data['buckets']:
+                cumulative += count
+                lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{stage="{stage}",le="+Inf"}} {data["count"]}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {data["sum"]}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {data["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, registry: MetricsRegistry, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """Arranca un servidor HTTP en segundo plano que renderiza el registro en cada petición"""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render(registry.snapshot()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+
+class PeriodicExport:
+    """Hilo que entrega una instantánea del registro a un exportador cada `interval` segundos"""
+
+    def __init__(self, registry: MetricsRegistry, exporter: MetricsExporter, interval: float = 60.0):
+        self.registry = registry
+        self.exporter = exporter
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-export", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.exporter.export(self.registry.snapshot())
+            except Exception as e:
+                print(f"Error exporting metrics: {str(e)}")
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+# Registro compartido por defecto
+metrics = MetricsRegistry(enabled=Config.METRICS_ENABLED)
+
+
+def start_exporters(registry: MetricsRegistry = None) -> list:
+    """Arranca los exportadores indicados en la configuración"""
+    registry = registry or metrics
+    started = []
+    if not registry.enabled:
+        return started
+    if Config.METRICS_PORT:
+        started.append(PrometheusExporter().serve(registry, Config.METRICS_PORT))
+    if Config.METRICS_LOG_INTERVAL:
+        started.append(PeriodicExport(registry, LogExporter(), Config.METRICS_LOG_INTERVAL))
+    return started
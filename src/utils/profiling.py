@@ -0,0 +1,128 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict
+
+
+class RequestProfiler:
+    """
+    Perfila una muestra de peticiones con cProfile (y opcionalmente tracemalloc)
+    y guarda los perfiles en un directorio rotativo junto con la categoría de
+    la consulta y los tiempos por etapa.
+
+    Las peticiones que superan `slow_threshold_ms` sin haber sido muestreadas
+    dejan sólo el registro de tiempos, ya que no se sabe de antemano que serán
+    lentas y perfilar todas las peticiones sería demasiado caro.
+    """
+
+    def __init__(self, directory: str, sample_rate: float = 0.001, slow_threshold_ms: float = None,
+                 trace_memory: bool = False, max_files: int = 200, top_allocations: int = 25):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.slow_threshold_ms = slow_threshold_ms or None
+        self.trace_memory = trace_memory
+        self.max_files = max_files
+        self.top_allocations = top_allocations
+        # cProfile admite un solo perfilador activo: las peticiones concurrentes no se muestrean
+        self._active = threading.Lock()
+        self._write_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def run(self, func, *args) -> Dict[str, Any]:
+        """
+        Ejecuta `func(*args, timings)` perfilándola si le toca en el muestreo.
+        `func` rellena `timings` con la duración de cada etapa
+        """
+        timings = {}
+        sampled = self.should_sample() and self._active.acquire(blocking=False)
+        if not sampled:
+            start = time.perf_counter()
+            result = func(*args, timings)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if self.slow_threshold_ms is not None and elapsed_ms >= self.slow_threshold_ms:
+                self._write(result, timings, elapsed_ms)
+            return result
+
+        profiler = cProfile.Profile()
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                result = func(*args, timings)
+            finally:
+                profiler.disable()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            memory = self._memory_report() if self.trace_memory else None
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            self._active.release()
+
+        self._write(result, timings, elapsed_ms, profiler, memory)
+        return result
+
+    def _memory_report(self) -> Dict[str, Any]:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'current_kb': current / 1024,
+            'peak_kb': peak / 1024,
+            'top_allocations': [
+                {'location': str(stat.traceback), 'size_kb': stat.size / 1024, 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:self.top_allocations]
+            ]
+        }
+
+    def _write(self, result: Dict[str, Any], timings: Dict[str, float], elapsed_ms: float,
+               profiler: cProfile.Profile = None, memory: Dict[str, Any] = None):
+        category = (result or {}).get('category') or 'unknown'
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}_{category}_{int(elapsed_ms)}ms"
+        report = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'category': category,
+            'elapsed_ms': elapsed_ms,
+            'stage_ms': {stage: seconds * 1000 for stage, seconds in timings.items()},
+            'error': (result or {}).get('error'),
+            'profiled': profiler is not None,
+        }
+        try:
+            with self._write_lock:
+                if profiler is not None:
+                    profiler.dump_stats(os.path.join(self.directory, f"{name}.prof"))
+                    report['top_functions'] = self._top_functions(profiler)
+                if memory is not None:
+                    report['memory'] = memory
+                with open(os.path.join(self.directory, f"{name}.json"), 'w') as f:
+                    json.dump(report, f, indent=2)
+                self._rotate()
+        except OSError as e:
+            print(f"Error writing profile: {str(e)}")
+
+    def _top_functions(self, profiler: cProfile.Profile, limit: int = 30) -> str:
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+        return stream.getvalue()
+
+    def _rotate(self):
+        """Borra los informes más antiguos por encima de `max_files`"""
+        reports = sorted(entry.name[:-len(".json")] for entry in os.scandir(self.directory)
+                         if entry.name.endswith(".json"))
+        for name in reports[:max(len(reports) - self.max_files, 0)]:
+            for extension in (".json", ".prof"):
+                try:
+                    os.remove(os.path.join(self.directory, name + extension))
+                except FileNotFoundError:
+                    pass
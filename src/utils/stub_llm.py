@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+
+class StubLLM:
+    """
+    LLM local que simula la latencia de un modelo real sin llamar a ninguna API.
+    Útil para pruebas, benchmarks y pruebas de carga.
+    """
+
+    def __init__(self, latency: float = 0.5, response: str = None, token_latency: float = 0.0):
+        self.latency = latency
+        self.response = response
+        # En streaming, `latency` es el tiempo hasta el primer fragmento y éste el de cada uno de los siguientes
+        self.token_latency = token_latency
+        self.calls = 0
+        self.prompts = 0
+        self._lock = threading.Lock()
+
+    def reply(self, messages) -> str:
+        """Texto de respuesta para una lista de mensajes"""
+        if self.response is not None:
+            return self.response
+        last_message = messages[-1].content if messages else ""
+        return f"Respuesta simulada de RentaCar para: {last_message[-120:].strip()}"
+
+    def _count(self, prompts: int):
+        with self._lock:
+            self.calls += 1
+            self.prompts += prompts
+
+    def invoke(self, messages, config=None, **kwargs) -> AIMessage:
+        self._count(1)
+        time.sleep(self.latency)
+        return AIMessage(content=self.reply(messages))
+
+    def batch(self, inputs, config=None, return_exceptions: bool = False, **kwargs):
+        """Como Runnable.batch: un hilo por prompt hasta max_concurrency"""
+        if not inputs:
+            return []
+        max_concurrency = (config or {}).get('max_concurrency') or len(inputs)
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = [executor.submit(self.invoke, messages) for messages in inputs]
+        if not return_exceptions:
+            return [future.result() for future in futures]
+        return [future.exception() or future.result() for future in futures]
+
+    def generate(self, messages_batch, **kwargs) -> LLMResult:
+        # Como BaseChatModel.generate: los prompts se procesan de uno en uno
+        self._count(len(messages_batch))
+        time.sleep(self.latency * len(messages_batch))
+        return self._result(messages_batch)
+
+    async def agenerate(self, messages_batch, **kwargs) -> LLMResult:
+        # Como BaseChatModel.agenerate: los prompts se lanzan a la vez
+        self._count(len(messages_batch))
+        await asyncio.gather(*(asyncio.sleep(self.latency) for _ in messages_batch))
+        return self._result(messages_batch)
+
+    def stream(self, messages, **kwargs):
+        self._count(1)
+        time.sleep(self.latency)
+        for index, word in enumerate(self.reply(messages).split(" ")):
+            if index:
+                time.sleep(self.token_latency)
+            yield AIMessageChunk(content=word if not index else " " + word)
+
+    def _result(self, messages_batch) -> LLMResult:
+        return LLMResult(generations=[
+            [ChatGeneration(message=AIMessage(content=self.reply(messages)))]
+            for messages in messages_batch
+        ])
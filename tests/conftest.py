@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.agents.rentacar_agent import RentaCarAgent
+from src.database.models import Base
+from src.learning.response_optimizer import ResponseOptimizer
+from src.utils.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def session():
+    # Base en memoria compartida por los hilos del camino asíncrono
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def make_agent(session):
+    """Agente con un LLM local y un registro de métricas propio"""
+    def make(llm, **kwargs) -> RentaCarAgent:
+        return RentaCarAgent(session, ResponseOptimizer(session), llm=llm, metrics=MetricsRegistry(), **kwargs)
+    return make
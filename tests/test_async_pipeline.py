@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from src.agents.llm_batcher import LLMBatcher
+from src.database.models import Interaction
+from src.utils.metrics import MetricsRegistry
+from src.utils.stub_llm import StubLLM
+
+QUERIES = [f"precio de un suv en madrid para {days} días" for days in range(1, 9)]
+
+
+async def run_concurrently(agent, queries):
+    return await asyncio.gather(*(agent.process_query_async(query) for query in queries))
+
+
+def test_async_queries_overlap_llm_latency(make_agent, session):
+    """Las consultas concurrentes esperan al LLM a la vez, no una tras otra"""
+    llm = StubLLM(latency=0.3)
+    agent = make_agent(llm)
+    # La primera consulta carga la ventana y el tokenizador: fuera de la medida
+    asyncio.run(agent.process_query_async("reservar un coche compacto"))
+
+    start = time.perf_counter()
+    results = asyncio.run(run_concurrently(agent, QUERIES))
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.3 * len(QUERIES) / 2
+    assert all('error' not in result for result in results)
+    ids = [result['interaction_id'] for result in results]
+    assert len(set(ids)) == len(QUERIES)
+    assert {row.query for row in session.query(Interaction).filter(Interaction.id.in_(ids))} == set(QUERIES)
+    assert llm.prompts == len(QUERIES) + 1
+
+
+def test_async_queries_share_llm_batch(make_agent):
+    llm = StubLLM(latency=0.2)
+    metrics = MetricsRegistry()
+    batcher = LLMBatcher(llm, max_batch_size=len(QUERIES), max_wait=0.2, metrics=metrics)
+    agent = make_agent(llm, batcher=batcher)
+    try:
+        results = asyncio.run(run_concurrently(agent, QUERIES))
+    finally:
+        batcher.close()
+
+    assert all('error' not in result for result in results)
+    counters = metrics.snapshot()['counters']
+    assert counters['llm_batch_prompts'] == len(QUERIES)
+    assert counters['llm_batches'] < len(QUERIES)
+
+
+def test_batcher_returns_each_caller_its_result():
+    llm = StubLLM(latency=0.2)
+    metrics = MetricsRegistry()
+    batcher = LLMBatcher(llm, max_batch_size=8, max_wait=0.2, metrics=metrics)
+    results = {}
+
+    def call(index):
+        results[index] = batcher.generate([HumanMessage(content=f"consulta {index}")])
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(8)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    batcher.close()
+
+    assert results == {index: llm.reply([HumanMessage(content=f"consulta {index}")]) for index in range(8)}
+    # Un lote concurrente tarda lo que un prompt, no la suma
+    assert elapsed < 0.2 * 4
+    counters = metrics.snapshot()['counters']
+    assert counters['llm_batch_prompts'] == 8
+    assert counters['llm_batch_slots'] == 8 * counters['llm_batches']
+
+
+class FailingLLM:
+    def batch(self, inputs, config=None, return_exceptions=False):
+        raise PermissionError("credenciales no válidas")
+
+
+def test_batcher_fails_all_callers_when_batch_fails():
+    metrics = MetricsRegistry()
+    batcher = LLMBatcher(FailingLLM(), max_batch_size=4, max_wait=0.1, request_timeout=10, metrics=metrics)
+    futures = [batcher.submit([HumanMessage(content=str(index))]) for index in range(4)]
+
+    start = time.perf_counter()
+    for future in futures:
+        with pytest.raises(PermissionError):
+            future.result(timeout=10)
+    batcher.close()
+
+    # Los llamantes reciben el error al momento, sin esperar al timeout
+    assert time.perf_counter() - start < 5
+    counters = metrics.snapshot()['counters']
+    assert counters['llm_batch_errors'] == 4
+    assert 'llm_batch_timeouts' not in counters
@@ -0,0 +1,119 @@
+import random
+import re
+
+import pytest
+
+from src.context.context_builder import ContextBuilder, PriceRange, VehicleType
+
+# Copia de referencia de las búsquedas por palabras clave anteriores al KeywordMatcher
+REFERENCE_VEHICLES = {
+    VehicleType.COMPACT: ["compacto", "pequeño", "económico", "city car"],
+    VehicleType.SEDAN: ["sedan", "mediano", "familiar"],
+    VehicleType.SUV: ["suv", "todoterreno", "4x4", "camioneta"],
+    VehicleType.LUXURY: ["lujo", "premium", "alta gama"],
+    VehicleType.VAN: ["van", "furgoneta", "minivan"]
+}
+REFERENCE_PRICES = {
+    PriceRange.ECONOMIC: ["económico", "barato", "bajo costo"],
+    PriceRange.MEDIUM: ["medio", "estándar", "normal"],
+    PriceRange.PREMIUM: ["premium", "caro", "alto"]
+}
+REFERENCE_INTENTS = {
+    'cotización': ['precio', 'costo', 'tarifa', 'cuánto cuesta'],
+    'reserva': ['reservar', 'alquilar', 'rentar', 'disponible'],
+    'información': ['características', 'especificaciones', 'tiene'],
+    'reclamo': ['problema', 'queja', 'reclamo', 'mal'],
+    'daños': ['daño', 'golpe', 'accidente', 'rayón']
+}
+REFERENCE_REQUIREMENTS = {
+    'gps': ['gps', 'navegador', 'navegación'],
+    'child_seat': ['silla', 'asiento', 'niño', 'bebé'],
+    'additional_driver': ['conductor adicional', 'segundo conductor'],
+    'insurance': ['seguro', 'cobertura'],
+    'automatic': ['automático', 'automática']
+}
+REFERENCE_CATEGORIES = [
+    ('pricing', ['precio', 'tarifa', 'costo']),
+    ('booking', ['reservar', 'reserva', 'booking']),
+    ('vehicle_info', ['vehículo', 'coche', 'auto']),
+    ('damage', ['daño', 'accidente', 'reparación']),
+    ('claims', ['reclamo', 'queja', 'problema'])
+]
+
+
+def first_match(table, query, default):
+    query = query.lower()
+    for label, keywords in table.items():
+        if any(keyword in query for keyword in keywords):
+            return label
+    return default
+
+
+def reference_requirements(query):
+    query = query.lower()
+    return {
+        requirement: any(keyword in query for keyword in keywords)
+        for requirement, keywords in REFERENCE_REQUIREMENTS.items()
+    }
+
+
+def reference_category(query):
+    return first_match(dict(REFERENCE_CATEGORIES), query, 'general')
+
+
+def reference_duration(query):
+    duration_days = None
+    for pattern, days in ((r'(\d+)\s*(?:día|dias|día)', 1), (r'(\d+)\s*(?:semana|semanas)', 7),
+                          (r'(\d+)\s*(?:mes|meses)', 30)):
+        match = re.search(pattern, query, re.IGNORECASE)
+        if match:
+            duration_days = int(match.group(1)) * days
+    return duration_days
+
+
+def corpus(size: int, seed: int = 0):
+    """Consultas aleatorias con todas las palabras clave, solapamientos, mayúsculas y relleno"""
+    keywords = sorted({keyword for table in (REFERENCE_VEHICLES, REFERENCE_PRICES, REFERENCE_INTENTS,
+                                             REFERENCE_REQUIREMENTS, dict(REFERENCE_CATEGORIES))
+                       for keywords in table.values() for keyword in keywords})
+    filler = ['quiero', 'un', 'para', 'el', 'fin', 'de', 'semana', 'desde', 'Madrid', 'hasta', 'Sevilla',
+              '3 días', '2 semanas', 'devolver en', 'aeropuerto', 'ALTO', 'Económico', 'minivans', 'autos',
+              'vancouver', 'automóvil', 'pequeñísimo', '¿', '?', 'y']
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(size):
+        words = [rng.choice(keywords if rng.random() < 0.4 else filler) for _ in range(rng.randrange(0, 12))]
+        query = (' ' if rng.random() < 0.8 else '').join(words)
+        queries.append(query.upper() if rng.random() < 0.1 else query)
+    return queries
+
+
+@pytest.fixture(scope='module')
+def builder():
+    return ContextBuilder()
+
+
+def test_build_context_matches_reference_scans(builder):
+    for query in corpus(5000):
+        context = builder.build_context(query)
+        assert context['vehicle_type'] == first_match(REFERENCE_VEHICLES, query, None), query
+        assert context['price_range'] == first_match(REFERENCE_PRICES, query, PriceRange.MEDIUM), query
+        assert context['query_intent'] == first_match(REFERENCE_INTENTS, query, 'información'), query
+        assert context['special_requirements'] == reference_requirements(query), query
+        assert context['duration_info']['duration_days'] == reference_duration(query), query
+
+
+def test_categorize_matches_reference_scans(builder):
+    for query in corpus(5000, seed=1):
+        assert builder.categorize(query) == reference_category(query), query
+
+
+def test_build_contexts_matches_build_context(builder):
+    queries = corpus(500, seed=2)
+    batched = list(builder.build_contexts(queries, batch_size=64))
+    assert len(batched) == len(queries)
+    for query, context in zip(queries, batched):
+        expected = builder.build_context(query)
+        for key in ('vehicle_type', 'price_range', 'query_intent', 'location_info', 'duration_info',
+                    'special_requirements'):
+            assert context[key] == expected[key], query
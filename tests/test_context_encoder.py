@@ -0,0 +1,55 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.context.context_builder import Season, VehicleType
+from src.learning.context_encoder import ContextEncoder
+from src.learning.response_optimizer import ResponseOptimizer
+
+VEHICLES = [VehicleType.SUV, VehicleType.COMPACT, 'SUV', 'compact', None, ['SUV'], {'type': 'van'}]
+SEASONS = [Season.HIGH, Season.LOW, 'HIGH', None, ['verano']]
+PRICES = [(30, 60), [30, 60], (50, 120), (40, 40), (80, 20), [0, 1000], (1.5, 2.5), (10,), None, 'MEDIUM']
+
+
+def random_context(rng: random.Random) -> dict:
+    context = {}
+    for key, values in (('vehicle_type', VEHICLES), ('season', SEASONS), ('price_range', PRICES)):
+        # Claves ausentes además de valores None
+        if rng.random() < 0.85:
+            context[key] = rng.choice(values)
+    return context
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_similarity_matches_reference(seed):
+    """La similitud vectorizada coincide con calculate_context_similarity fila a fila"""
+    rng = random.Random(seed)
+    optimizer = ResponseOptimizer(session=None)
+    encoder = ContextEncoder()
+    stored = [random_context(rng) for _ in range(300)]
+    matrix = encoder.encode(stored)
+
+    for _ in range(50):
+        query_context = random_context(rng)
+        expected = [optimizer.calculate_context_similarity(query_context, context) for context in stored]
+        np.testing.assert_allclose(encoder.similarity(query_context, matrix), expected, rtol=0, atol=1e-12)
+
+
+def test_similarity_on_row_subset():
+    rng = random.Random(42)
+    optimizer = ResponseOptimizer(session=None)
+    encoder = ContextEncoder()
+    stored = [random_context(rng) for _ in range(100)]
+    matrix = encoder.encode(stored)
+    rows = np.array([3, 17, 42, 99])
+
+    query_context = random_context(rng)
+    expected = [optimizer.calculate_context_similarity(query_context, stored[row]) for row in rows]
+    np.testing.assert_allclose(encoder.similarity(query_context, matrix, rows), expected, rtol=0, atol=1e-12)
+
+
+def test_unseen_values_never_match():
+    encoder = ContextEncoder()
+    matrix = encoder.encode([{'vehicle_type': 'SUV', 'season': 'HIGH'}])
+    assert encoder.similarity({'vehicle_type': 'VAN', 'season': 'LOW'}, matrix).tolist() == [0.0]
@@ -0,0 +1,73 @@
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from src.agents.streaming import ResponseStream
+from src.database.models import Interaction
+from src.utils.stub_llm import StubLLM
+
+FALLBACK = "Lo siento, estoy teniendo problemas para procesar tu consulta. ¿Podrías reformularla?"
+
+
+class BrokenStreamLLM(StubLLM):
+    """Corta el stream tras el primer fragmento"""
+
+    def stream(self, messages, **kwargs):
+        yield AIMessageChunk(content="Respuesta")
+        raise ConnectionError("conexión perdida")
+
+
+def test_stream_yields_chunks_and_records_timings(make_agent, session):
+    agent = make_agent(StubLLM(latency=0.05, token_latency=0.01))
+    stream = agent.process_query_stream("precio de un suv en madrid")
+
+    chunks = list(stream)
+
+    assert len(chunks) > 1
+    result = stream.result
+    assert result['response'] == "".join(chunks)
+    assert 0.05 <= result['time_to_first_token'] <= result['generation_time']
+
+    interaction = session.get(Interaction, result['interaction_id'])
+    assert interaction.response == result['response']
+    assert interaction.time_to_first_token == result['time_to_first_token']
+    assert interaction.generation_time == result['generation_time']
+    assert agent.metrics.snapshot()['stages']['time_to_first_token']['count'] == 1
+
+
+def test_stream_falls_back_when_generation_fails(make_agent, session):
+    agent = make_agent(BrokenStreamLLM(latency=0))
+    stream = agent.process_query_stream("precio de un suv en madrid")
+
+    chunks = list(stream)
+
+    assert chunks == ["Respuesta", FALLBACK]
+    assert stream.result == {'response': FALLBACK, 'error': "conexión perdida"}
+    assert agent.metrics.snapshot()['counters']['errors'] == 1
+    assert session.query(Interaction).count() == 0
+
+
+def test_stream_reports_recording_errors(make_agent, monkeypatch):
+    agent = make_agent(StubLLM(latency=0))
+
+    def failing_record(*args, **kwargs):
+        raise RuntimeError("base de datos no disponible")
+
+    monkeypatch.setattr(agent, '_record_interaction', failing_record)
+    stream = agent.process_query_stream("precio de un suv en madrid")
+
+    # La respuesta ya entregada no se interrumpe con una excepción
+    chunks = list(stream)
+
+    assert "".join(chunks).startswith("Respuesta simulada")
+    assert stream.result['error'] == "base de datos no disponible"
+    assert agent.metrics.snapshot()['counters']['errors'] == 1
+
+
+def test_response_stream_cannot_be_consumed_twice():
+    stream = ResponseStream(iter(["a", "", "b"]), lambda text, ttft, total: {'response': text})
+
+    assert stream.text() == "ab"
+    assert stream.result == {'response': "ab"}
+    assert stream.time_to_first_token is not None
+    with pytest.raises(RuntimeError):
+        list(stream)